@@ -0,0 +1,385 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import itertools
+from multiprocessing import Pool
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import Table, TableStyle, Frame, Spacer
+
+from generate_pdf_guide import NumberedCanvas, C_BORDER, C_DARK, part_name
+
+# Two ticket columns per letter page, inside the same 54pt margins as the guide
+PAGE_MARGIN = 54
+COLUMN_GAP = 12
+TICKET_WIDTH = (letter[0] - 2 * PAGE_MARGIN - COLUMN_GAP) / 2
+RECEIPT_COLS = [TICKET_WIDTH - 136, 26, 50, 60]
+KOT_COLS = [TICKET_WIDTH - 40, 40]
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+FONT_SIZE = 7
+
+class ReprintCanvas(NumberedCanvas):
+    header_title = "SIMS CAFE — RECEIPT & KITCHEN TICKET REPRINTS"
+    header_subtitle = "Audit Copy"
+    footer_text = "SIMS CAFE Management System | Reprinted from archived print jobs"
+    first_decorated_page = 1
+
+    # Pages are stamped as they complete instead of being held back for
+    # "Page X of Y", which would also keep a copy of every page's state.
+    # ReportLab still keeps each finished page's content until save(), so
+    # memory grows with the pages in a file (roughly 46 MB peak for 4k
+    # tickets, 90 MB for 20k); --part-size caps it by splitting the output.
+    def showPage(self):
+        self.draw_header_footer()
+        super(NumberedCanvas, self).showPage()
+
+    def save(self):
+        super(NumberedCanvas, self).save()
+
+def _lower_keys(value):
+    # CafePrinter deserializes case-insensitively, so accept both the Dart
+    # camelCase payloads and PascalCase dumps of the C# records.
+    if isinstance(value, dict):
+        return {k.lower(): _lower_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_lower_keys(v) for v in value]
+    return value
+
+def _wrap(text, width, font=FONT, size=FONT_SIZE):
+    lines = simpleSplit(str(text or ""), font, size, width - 6)
+    return "\n".join(lines) if lines else ""
+
+def _money(value, places):
+    return f"{float(value or 0):.{places}f}"
+
+def _centered(rows, style, text, ncols, bold=False, size=FONT_SIZE):
+    if not text:
+        return
+    font = FONT_BOLD if bold else FONT
+    row = len(rows)
+    rows.append([_wrap(text, TICKET_WIDTH, font, size)] + [""] * (ncols - 1))
+    style.append(('SPAN', (0, row), (-1, row)))
+    style.append(('ALIGN', (0, row), (-1, row), 'CENTER'))
+    style.append(('FONT', (0, row), (-1, row), font, size))
+
+def _rule(style, row, weight=0.75):
+    style.append(('LINEBELOW', (0, row), (-1, row), weight, C_DARK))
+
+def layout_receipt(d):
+    places = max(0, min(int(d.get('decimalplaces', 3)), 3))
+    rows, style = [], []
+    _centered(rows, style, d.get('businessname'), 4, bold=True, size=9)
+    _centered(rows, style, d.get('secondbusinessname'), 4, bold=True)
+    _centered(rows, style, d.get('businessaddress'), 4)
+    _centered(rows, style, d.get('businessphone'), 4)
+    _centered(rows, style, d.get('title'), 4, bold=True)
+    _centered(rows, style, f"ORDER #{d.get('ordernumber') or '-'}", 4)
+    _centered(rows, style, d.get('createdat'), 4)
+    _centered(rows, style, f"Service: {d.get('servicetype') or ''}", 4, bold=True)
+    if d.get('personname'):
+        _centered(rows, style, f"Customer: {d['personname']}", 4)
+    _rule(style, len(rows) - 1)
+
+    header = len(rows)
+    rows.append(["Item", "Qty", "Price", "Total"])
+    style.append(('FONT', (0, header), (-1, header), FONT_BOLD, FONT_SIZE))
+    _rule(style, header)
+    for item in d.get('items') or []:
+        qty = int(item.get('quantity') or 0)
+        price = float(item.get('price') or 0)
+        rows.append([
+            _wrap(item.get('name'), RECEIPT_COLS[0]),
+            str(qty),
+            _money(price, places),
+            _money(price * qty, places),
+        ])
+    _rule(style, len(rows) - 1)
+
+    tax_rate = float(d.get('taxrate') or 0)
+    totals = [("Subtotal:", d.get('subtotal'), False),
+              (f"Tax ({tax_rate:.1f}%):" if tax_rate > 0 else "Tax:", d.get('tax'), False)]
+    if float(d.get('deliverycharge') or 0) > 0:
+        totals.append(("Delivery Fee:", d['deliverycharge'], False))
+    if float(d.get('discount') or 0) > 0:
+        totals.append(("Discount:", d['discount'], False))
+    totals.append(("TOTAL:", d.get('total'), True))
+    deposit = float(d.get('depositamount') or 0)
+    if deposit > 0:
+        totals.append(("Advance Paid:", deposit, False))
+        totals.append(("Balance Due:", float(d.get('total') or 0) - deposit, True))
+    for label, value, is_total in totals:
+        row = len(rows)
+        rows.append([label, "", "", _money(value, places)])
+        style.append(('SPAN', (0, row), (2, row)))
+        style.append(('ALIGN', (0, row), (2, row), 'RIGHT'))
+        if is_total:
+            style.append(('FONT', (0, row), (-1, row), FONT_BOLD, FONT_SIZE + 1))
+            style.append(('LINEABOVE', (0, row), (-1, row), 0.75, C_DARK))
+    style.append(('ALIGN', (1, header), (-1, -1), 'RIGHT'))
+    return {'rows': rows, 'style': style, 'col_widths': RECEIPT_COLS}
+
+def _kot_changes(items, originals):
+    # Same diff CafePrinter's KotRenderer applies to edited tickets
+    by_id = {str(o.get('id')): o for o in originals}
+    current = {str(i.get('id')): i for i in items}
+    cancelled = []
+    for orig in originals:
+        match = current.get(str(orig.get('id')))
+        if match is None or int(match.get('quantity') or 0) < int(orig.get('quantity') or 0):
+            name = (match or {}).get('name') or orig.get('name') or f"#{orig.get('id')}"
+            cancelled.append((name, int(orig.get('quantity') or 0), ""))
+    added = []
+    for item in items:
+        orig = by_id.get(str(item.get('id')))
+        qty = int(item.get('quantity') or 0)
+        if orig is None:
+            added.append((item.get('name'), qty, item.get('kitchennote')))
+        elif qty > int(orig.get('quantity') or 0):
+            added.append((item.get('name'), qty - int(orig['quantity']), item.get('kitchennote')))
+    return cancelled, added
+
+def layout_kot(d):
+    rows, style = [], []
+    _centered(rows, style, "KITCHEN ORDER", 2, bold=True, size=9)
+    if d.get('isedited'):
+        _centered(rows, style, "EDITED", 2, bold=True)
+        style.append(('BOX', (0, len(rows) - 1), (-1, len(rows) - 1), 0.75, C_DARK))
+    _centered(rows, style, f"ORDER #{d.get('ordernumber') or '-'}", 2, bold=True)
+    _centered(rows, style, d.get('createdat'), 2)
+    _centered(rows, style, f"Service: {d.get('servicetype') or ''}", 2, bold=True)
+    _rule(style, len(rows) - 1)
+
+    header = len(rows)
+    rows.append(["Item", "Qty"])
+    style.append(('FONT', (0, header), (-1, header), FONT_BOLD, FONT_SIZE))
+    _rule(style, header)
+
+    def add_items(entries, boxed=False):
+        for name, qty, note in entries:
+            row = len(rows)
+            rows.append([_wrap(name, KOT_COLS[0]), str(qty)])
+            style.append(('FONT', (1, row), (1, row), FONT_BOLD, FONT_SIZE))
+            if boxed:
+                style.append(('BOX', (0, row), (-1, row), 0.5, C_DARK))
+            if note:
+                _centered(rows, style, f"NOTE: {note}", 2, bold=True)
+                style.append(('ALIGN', (0, len(rows) - 1), (-1, len(rows) - 1), 'LEFT'))
+
+    items = d.get('items') or []
+    originals = d.get('originalitems')
+    if not d.get('isedited') or originals is None:
+        add_items((i.get('name'), int(i.get('quantity') or 0), i.get('kitchennote')) for i in items)
+    else:
+        cancelled, added = _kot_changes(items, originals)
+        if cancelled:
+            _centered(rows, style, "CANCELLED:", 2, bold=True)
+            style.append(('ALIGN', (0, len(rows) - 1), (-1, len(rows) - 1), 'LEFT'))
+            add_items(cancelled, boxed=True)
+        if added:
+            _centered(rows, style, "NEW ITEMS:", 2, bold=True)
+            style.append(('ALIGN', (0, len(rows) - 1), (-1, len(rows) - 1), 'LEFT'))
+            add_items(added)
+    _rule(style, len(rows) - 1, weight=1.5)
+    style.append(('ALIGN', (1, header), (1, -1), 'RIGHT'))
+    return {'rows': rows, 'style': style, 'col_widths': KOT_COLS}
+
+def is_kot(payload):
+    return 'isedited' in payload or 'originalitems' in payload
+
+def layout_payload(payload):
+    d = _lower_keys(payload)
+    try:
+        return layout_kot(d) if is_kot(d) else layout_receipt(d)
+    except (TypeError, ValueError, AttributeError) as e:
+        rows, style = [], []
+        _centered(rows, style, f"Unreadable print job: {e}", 1, bold=True)
+        return {'rows': rows, 'style': style, 'col_widths': [TICKET_WIDTH]}
+
+def _iter_json_file(handle):
+    first = handle.readline()
+    if not first.strip():
+        first = next((line for line in handle if line.strip()), "")
+    if not first:
+        return
+    # JSON Lines is streamed one job at a time; anything else (a pretty
+    # printed payload or an array of payloads) has to be parsed whole.
+    try:
+        record = json.loads(first)
+        streaming = isinstance(record, dict)
+    except json.JSONDecodeError:
+        streaming = False
+    if streaming:
+        yield record
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+        return
+    data = json.loads(first + handle.read())
+    if isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+def iter_json_payloads(paths):
+    for path in paths:
+        if path == "-":
+            yield from _iter_json_file(sys.stdin)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith((".json", ".jsonl")):
+                    with open(os.path.join(path, name), encoding="utf-8") as f:
+                        yield from _iter_json_file(f)
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield from _iter_json_file(f)
+
+ORDER_ROWS_SQL = """
+    SELECT o.id, o.main_order_number, o.staff_order_number, o.service_type,
+           o.customer_name, o.subtotal, o.tax, o.discount, o.delivery_charge, o.total,
+           o.deposit_amount, o.created_at,
+           i.menu_item_id, i.name, i.price, i.quantity, i.kitchen_note
+    FROM orders o
+    LEFT JOIN order_items i ON i.order_id = o.id
+    WHERE o.created_at >= ? AND o.created_at < ? AND o.is_deleted = 0
+    ORDER BY o.id, i.id
+"""
+
+def iter_order_payloads(db_path, since="", until="9999", business_name="SIMS CAFE", decimal_places=3):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(ORDER_ROWS_SQL, (since, until))
+        for _, group in itertools.groupby(cursor, key=lambda r: r[0]):
+            group = list(group)
+            o = group[0]
+            yield {
+                'businessName': business_name,
+                'title': "RECEIPT (REPRINT)",
+                'serviceType': o[3] or "",
+                'orderNumber': str(o[1] or o[2] or o[0]),
+                'personName': o[4] or "",
+                'subtotal': o[5] or 0,
+                'tax': o[6] or 0,
+                'discount': o[7] or 0,
+                'deliveryCharge': o[8] or 0,
+                'total': o[9] or 0,
+                'depositAmount': o[10] or 0,
+                'createdAt': o[11] or "",
+                'decimalPlaces': decimal_places,
+                'items': [
+                    {'id': str(r[12]), 'name': r[13], 'price': r[14] or 0,
+                     'quantity': r[15] or 0, 'kitchenNote': r[16] or ""}
+                    for r in group if r[13] is not None
+                ],
+            }
+    finally:
+        conn.close()
+
+class ReprintWriter:
+    def __init__(self, filename):
+        self.canv = ReprintCanvas(filename, pagesize=letter)
+        self.tickets = 0
+        self._new_page()
+
+    def _new_page(self):
+        height = letter[1] - 2 * PAGE_MARGIN
+        self.frames = [
+            Frame(PAGE_MARGIN + col * (TICKET_WIDTH + COLUMN_GAP), PAGE_MARGIN, TICKET_WIDTH, height,
+                  leftPadding=0, rightPadding=0, topPadding=6, bottomPadding=0)
+            for col in range(2)
+        ]
+        self.frame_index = 0
+
+    def _next_frame(self):
+        self.frame_index += 1
+        if self.frame_index == len(self.frames):
+            self.canv.showPage()
+            self._new_page()
+
+    def add(self, layout):
+        style = [
+            ('FONT', (0, 0), (-1, -1), FONT, FONT_SIZE),
+            ('TEXTCOLOR', (0, 0), (-1, -1), C_DARK),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1.5),
+            ('BOX', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ] + layout['style']
+        pending = [Table(layout['rows'], colWidths=layout['col_widths'], style=TableStyle(style))]
+        while pending:
+            flowable = pending.pop(0)
+            frame = self.frames[self.frame_index]
+            if frame.add(flowable, self.canv):
+                continue
+            parts = frame.split(flowable, self.canv)
+            if len(parts) >= 2 and frame.add(parts[0], self.canv):
+                pending[:0] = parts[1:]
+            elif frame._atTop:
+                # A single row taller than an empty column: draw it clipped
+                # rather than looping forever looking for room.
+                _, height = flowable.wrap(frame._getAvailableWidth(), frame._y - frame._y1p)
+                flowable.drawOn(self.canv, frame._x, frame._y - height)
+            else:
+                pending.insert(0, flowable)
+            self._next_frame()
+        self.frames[self.frame_index].add(Spacer(1, 8), self.canv)
+        self.tickets += 1
+
+    def close(self):
+        self.canv.save()
+
+def render_batch(payloads, filename, workers=None, batch_size=200, part_size=None):
+    # Returns (tickets, files). With part_size every part_size tickets go to
+    # their own file, so no canvas ever holds more than one part's pages.
+    files = [part_name(filename, 1) if part_size else filename]
+    writer = ReprintWriter(files[-1])
+    tickets = 0
+    payloads = iter(payloads)
+    with Pool(processes=workers) as pool:
+        # Layout runs in the pool one batch ahead of drawing, so at most two
+        # batches of payloads and layouts are waiting at any time.
+        batch = list(itertools.islice(payloads, batch_size))
+        pending = pool.map_async(layout_payload, batch) if batch else None
+        while pending is not None:
+            layouts = pending.get()
+            batch = list(itertools.islice(payloads, batch_size))
+            pending = pool.map_async(layout_payload, batch) if batch else None
+            for layout in layouts:
+                if part_size and writer.tickets == part_size:
+                    writer.close()
+                    files.append(part_name(filename, len(files) + 1))
+                    writer = ReprintWriter(files[-1])
+                writer.add(layout)
+                tickets += 1
+            print(f"Rendered {tickets} tickets", file=sys.stderr)
+    writer.close()
+    return tickets, files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render archived receipts and KOTs into one reprint PDF.")
+    parser.add_argument("inputs", nargs="*", help="JSON / JSON Lines payload files or directories ('-' for stdin)")
+    parser.add_argument("--db", help="read receipts from a cafe_orders.db instead of JSON payloads")
+    parser.add_argument("--since", default="", help="first created_at to include (ISO 8601, --db only)")
+    parser.add_argument("--until", default="9999", help="created_at upper bound, exclusive (--db only)")
+    parser.add_argument("--business-name", default="SIMS CAFE")
+    parser.add_argument("--decimal-places", type=int, default=3)
+    parser.add_argument("-o", "--output", default="SIMS_Cafe_Reprints.pdf")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--part-size", type=int, default=None,
+                        help="tickets per output file (NAME_001.pdf, ...); bounds memory for very large runs")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        payloads = iter_order_payloads(args.db, args.since, args.until, args.business_name, args.decimal_places)
+    elif args.inputs:
+        payloads = iter_json_payloads(args.inputs)
+    else:
+        parser.error("give payload files or --db")
+    count, files = render_batch(payloads, args.output, args.workers, args.batch_size, args.part_size)
+    print(f"Successfully generated {', '.join(files)} ({count} tickets)")
+
+if __name__ == '__main__':
+    main()
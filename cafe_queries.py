@@ -0,0 +1,47 @@
+# SQL shared by the report scripts and db_maintenance.py, which times
+# the same statements. Kept apart from the scripts so the maintenance
+# tool does not pull in ReportLab and numpy just for these strings.
+
+# created_at is an ISO-8601 string, so a half-open string range selects whole
+# days and is answered from idx_orders_created_at. Wrapping the column in
+# date() would force a scan of every order ever taken. Ordering by the index
+# key and then by the items' rowid lets SQLite stream rows without a sort.
+EXPORT_SQL = """
+    SELECT o.id, o.main_order_number, o.staff_order_number, o.created_at, o.service_type,
+           o.status, o.payment_method, o.cash_amount, o.bank_amount, o.customer_name,
+           o.subtotal, o.tax, o.discount, o.delivery_charge, o.total,
+           i.menu_item_id, i.name, i.price, i.quantity, i.price * i.quantity,
+           i.purchase_price, i.purchase_price * i.quantity, i.tax_exempt, i.kitchen_note
+    FROM orders o
+    LEFT JOIN order_items i ON i.order_id = o.id
+    WHERE o.created_at >= ? AND o.created_at < ? AND o.is_deleted = 0
+    ORDER BY o.created_at, o.id, i.id
+"""
+
+# strftime('%s') turns the ISO created_at into epoch seconds inside SQLite,
+# so Python never parses a date string. The range predicate is the same
+# index-friendly one the day-end export uses. No ORDER BY: sorting in numpy
+# is far cheaper than SQLite's temp b-tree.
+ORDER_COLUMNS_SQL = """
+    SELECT id, CAST(strftime('%s', created_at) AS INTEGER), COALESCE(total, 0), COALESCE(tax, 0),
+           COALESCE(discount, 0)
+    FROM orders
+    WHERE created_at >= ? AND created_at < ? AND is_deleted = 0 AND status = ?
+"""
+
+ITEM_COLUMNS_SQL = """
+    SELECT i.order_id, i.menu_item_id, i.quantity, i.price, COALESCE(i.purchase_price, 0)
+    FROM orders o
+    JOIN order_items i ON i.order_id = o.id
+    WHERE o.created_at >= ? AND o.created_at < ? AND o.is_deleted = 0 AND o.status = ?
+"""
+
+# One pass over the whole ledger, already in statement order. There is no
+# customerId index in the app's schema, so SQLite sorts once here instead of
+# answering one query per customer.
+TRANSACTIONS_SQL = """
+    SELECT customerId, customerName, orderNumber, amount, createdAt, serviceType, isCompleted, updated_at
+    FROM credit_transactions
+    WHERE is_deleted = 0 AND createdAt < ?
+    ORDER BY customerId, createdAt, id
+"""
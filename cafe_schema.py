@@ -0,0 +1,199 @@
+# SQLite schemas of the app's local databases, as created by the
+# repositories under cafeapp/lib (see section 5 of generate_pdf_guide.py).
+
+MENU_DB = "cafe_menu.db"
+ORDERS_DB = "cafe_orders.db"
+PERSONS_DB = "cafe_persons.db"
+CREDIT_DB = "credit_transactions.db"
+EXPENSES_DB = "cafe_expenses.db"
+DELIVERY_BOYS_DB = "cafe_delivery_boys_store.db"
+DATABASES = (ORDERS_DB, MENU_DB, PERSONS_DB, CREDIT_DB, EXPENSES_DB, DELIVERY_BOYS_DB)
+
+MENU_ITEMS = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    imageUrl TEXT,
+    category TEXT NOT NULL,
+    isAvailable INTEGER NOT NULL,
+    isDeleted INTEGER NOT NULL DEFAULT 0,
+    lastUpdated TEXT NOT NULL,
+    taxExempt INTEGER NOT NULL DEFAULT 0,
+    isPerPlate INTEGER NOT NULL DEFAULT 0,
+    purchasePrice REAL NOT NULL DEFAULT 0.0,
+    barcode TEXT DEFAULT '',
+    sizes TEXT DEFAULT '[]'
+)
+"""
+
+ORDERS = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    staff_order_number INTEGER,
+    main_order_number INTEGER,
+    staff_device_id TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    subtotal REAL NOT NULL,
+    tax REAL NOT NULL,
+    discount REAL NOT NULL,
+    total REAL NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    payment_method TEXT DEFAULT 'cash',
+    customer_id TEXT,
+    cash_amount REAL,
+    bank_amount REAL,
+    is_synced INTEGER NOT NULL DEFAULT 0,
+    synced_at TEXT,
+    main_number_assigned INTEGER NOT NULL DEFAULT 0,
+    delivery_charge REAL,
+    delivery_address TEXT,
+    delivery_boy TEXT,
+    event_date TEXT,
+    event_time TEXT,
+    event_guest_count INTEGER,
+    event_type TEXT,
+    deposit_amount REAL,
+    token_number TEXT,
+    customer_name TEXT,
+    updated_at TEXT,
+    is_deleted INTEGER NOT NULL DEFAULT 0,
+    is_temp_receipt_printed INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+ORDER_ITEMS = """
+CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    menu_item_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    kitchen_note TEXT,
+    tax_exempt INTEGER NOT NULL DEFAULT 0,
+    purchase_price REAL NOT NULL DEFAULT 0.0,
+    FOREIGN KEY (order_id) REFERENCES orders (id) ON DELETE CASCADE
+)
+"""
+
+ORDER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_staff_device ON orders (staff_device_id)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_main_number ON orders (main_order_number)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_deposit_amount ON orders (deposit_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_event_date ON orders (event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders (updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_is_synced ON orders (is_synced)",
+]
+
+def create_orders_schema(conn):
+    create_schema(conn, ORDERS_DB)
+
+PERSONS = """
+CREATE TABLE IF NOT EXISTS persons (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    phoneNumber TEXT NOT NULL,
+    place TEXT NOT NULL,
+    dateVisited TEXT NOT NULL,
+    credit REAL DEFAULT 0.0,
+    updated_at TEXT,
+    is_deleted INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+CREDIT_TRANSACTIONS = """
+CREATE TABLE IF NOT EXISTS credit_transactions (
+    id TEXT PRIMARY KEY,
+    customerId TEXT NOT NULL,
+    customerName TEXT NOT NULL,
+    orderNumber TEXT NOT NULL,
+    amount REAL NOT NULL,
+    createdAt TEXT NOT NULL,
+    serviceType TEXT NOT NULL,
+    isCompleted INTEGER DEFAULT 0,
+    updated_at TEXT,
+    is_deleted INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+EXPENSES = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    cashier TEXT NOT NULL,
+    accountType TEXT NOT NULL,
+    grandTotal REAL NOT NULL,
+    createdAt TEXT NOT NULL
+)
+"""
+
+EXPENSE_ITEMS = """
+CREATE TABLE IF NOT EXISTS expense_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    expense_id INTEGER NOT NULL,
+    slNo INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    narration TEXT NOT NULL,
+    amount REAL NOT NULL,
+    remarks TEXT,
+    FOREIGN KEY (expense_id) REFERENCES expenses (id) ON DELETE CASCADE
+)
+"""
+
+DELIVERY_BOYS = """
+CREATE TABLE IF NOT EXISTS delivery_boys (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    phoneNumber TEXT NOT NULL,
+    updated_at TEXT,
+    is_deleted INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Tables per database file; ORDER_INDEXES are kept apart so bulk loads can
+# build them once at the end instead of on every insert.
+SCHEMAS = {
+    ORDERS_DB: [ORDERS, ORDER_ITEMS],
+    MENU_DB: [MENU_ITEMS],
+    PERSONS_DB: [PERSONS],
+    CREDIT_DB: [CREDIT_TRANSACTIONS],
+    EXPENSES_DB: [EXPENSES, EXPENSE_ITEMS],
+    DELIVERY_BOYS_DB: [DELIVERY_BOYS],
+}
+
+# The version each repository passes to sqflite's openDatabase(). sqflite
+# runs onCreate on any file at user_version 0, and its CREATE TABLE fails
+# on tables that already exist, so files created here are stamped with it.
+SCHEMA_VERSIONS = {
+    ORDERS_DB: 18,
+    MENU_DB: 7,
+    PERSONS_DB: 3,
+    CREDIT_DB: 2,
+    EXPENSES_DB: 1,
+    DELIVERY_BOYS_DB: 2,
+}
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def create_schema(conn, database, indexes=True):
+    fresh = schema_version(conn) == 0
+    for sql in SCHEMAS[database]:
+        conn.execute(sql)
+    if indexes and database == ORDERS_DB:
+        for sql in ORDER_INDEXES:
+            conn.execute(sql)
+    if fresh:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSIONS[database]}")
+
+def tune_for_bulk_load(conn):
+    # The app opens every database in WAL mode; NORMAL sync is durable
+    # across application crashes and avoids an fsync per transaction.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
@@ -0,0 +1,260 @@
+import io
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageChops
+
+from remove_bg import key_white_background, crop_to_content
+from profiling import mark
+
+THERMAL_WIDTH = 512      # EscPosConverter.ToEscPos resizes every receipt to 512 dots
+
+def _need_image(value, stage):
+    if not isinstance(value, Image.Image):
+        raise ValueError(f"'{stage}' needs a decoded image; put 'decode' before it")
+    return value
+
+def decode(data):
+    img = Image.open(io.BytesIO(data))
+    # Image.open only reads the header; load() so the decode cost lands here
+    img.load()
+    return img
+
+def key(img, threshold=200):
+    return key_white_background(_need_image(img, "key"), threshold)
+
+def trim(img):
+    img = _need_image(img, "trim")
+    if "A" in img.getbands():
+        return crop_to_content(img)
+    # Not keyed yet: trim the white margin instead of the transparent one
+    bbox = ImageChops.difference(img.convert("RGB"), Image.new("RGB", img.size, "white")).getbbox()
+    return img.crop(bbox) if bbox else img
+
+def resize(img, max_size=512, width=None):
+    img = _need_image(img, "resize")
+    if width:
+        if img.width == width:
+            return img
+        return img.resize((width, max(1, img.height * width // img.width)), Image.LANCZOS)
+    if max(img.size) <= max_size:
+        return img
+    img = img.copy()
+    img.thumbnail((max_size, max_size))
+    return img
+
+def quantize(img, colors=256):
+    img = _need_image(img, "quantize")
+    # Fast octree is the only quantizer Pillow offers for RGBA
+    method = Image.Quantize.FASTOCTREE if img.mode == "RGBA" else Image.Quantize.MEDIANCUT
+    return img.quantize(colors, method=method)
+
+def encode(img, format="PNG", optimize=False):
+    out = io.BytesIO()
+    _need_image(img, "encode").save(out, format, optimize=optimize)
+    return out.getvalue()
+
+def thermal_rasterize(img, threshold=128):
+    img = _need_image(img, "thermal-rasterize")
+    if "A" in img.getbands() or img.mode == "P":
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", img.size, "white")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        img = flat
+    # Same as ToEscPos: ITU-R 601 grayscale, dark pixels (< threshold) are
+    # printed dots, MSB first, rows padded to whole bytes.
+    lut = [255 if v < threshold else 0 for v in range(256)]
+    bits = img.convert("L").point(lut, "1")
+    width_bytes = (bits.width + 7) // 8
+    header = bytes([0x1D, 0x76, 0x30, 0x00, width_bytes & 0xFF, width_bytes >> 8,
+                    bits.height & 0xFF, bits.height >> 8])
+    return header + bits.tobytes()
+
+STAGES = {
+    'decode': decode,
+    'key': key,
+    'trim': trim,
+    'resize': resize,
+    'quantize': quantize,
+    'encode': encode,
+    'thermal-rasterize': thermal_rasterize,
+}
+
+# Each profile is the ordered list of stages with their options. The output
+# is whatever the last stage returns: encoded file bytes or an ESC/POS raster.
+PROFILES = {
+    'icon': [('decode', {}), ('key', {}), ('trim', {}), ('encode', {})],
+    'menu': [('decode', {}), ('key', {}), ('trim', {}), ('resize', {'max_size': 512}), ('encode', {})],
+    'web': [('decode', {}), ('key', {}), ('trim', {}), ('resize', {'max_size': 256}),
+            ('quantize', {'colors': 256}), ('encode', {'optimize': True})],
+    'thermal': [('decode', {}), ('trim', {}), ('resize', {'width': THERMAL_WIDTH}), ('thermal-rasterize', {})],
+}
+
+OUTPUT_SUFFIX = {'thermal-rasterize': ".bin", 'encode': ".png"}
+
+def build_stages(profile="menu", order=None, skip=(), **overrides):
+    # order reorders (or adds) stages by name, skip drops them, overrides
+    # replace options per stage: build_stages('menu', resize={'max_size': 128})
+    options = dict(PROFILES[profile])
+    names = list(order) if order else [name for name, _ in PROFILES[profile]]
+    stages = []
+    for name in names:
+        if name in skip:
+            continue
+        if name not in STAGES:
+            raise ValueError(f"unknown stage '{name}' (choose from {', '.join(STAGES)})")
+        stages.append((name, {**options.get(name, {}), **overrides.get(name, {})}))
+    return stages
+
+def payload_size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, Image.Image):
+        if value.mode == "1":
+            return (value.width + 7) // 8 * value.height
+        return value.width * value.height * len(value.getbands())
+    return 0
+
+def _pil_blocks():
+    stats = Image.core.get_stats()
+    return stats['new_count'], stats['allocated_blocks'] + stats['reused_blocks']
+
+def run_pipeline(data, stages):
+    # Runs one image through the stages and returns (result, trace). Pixel
+    # buffers live in Pillow's C arena, so allocations are counted as new
+    # images and arena blocks; Python-side peak is added when tracemalloc
+    # is running.
+    trace = []
+    value = data
+    tracing = tracemalloc.is_tracing()
+    for name, options in stages:
+        size_in = payload_size(value)
+        images_before, blocks_before = _pil_blocks()
+        if tracing:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        value = STAGES[name](value, **options)
+        elapsed = time.perf_counter() - started
+        images_after, blocks_after = _pil_blocks()
+        record = {
+            'stage': name,
+            'ms': elapsed * 1000,
+            'bytes_in': size_in,
+            'bytes_out': payload_size(value),
+            'images': images_after - images_before,
+            'blocks': blocks_after - blocks_before,
+        }
+        if tracing:
+            record['py_peak'] = tracemalloc.get_traced_memory()[1] - traced_before
+        trace.append(record)
+        mark(name)
+    return value, trace
+
+def process_file(path, stages):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        result, trace = run_pipeline(data, stages)
+        return path, result, trace, None
+    except Exception as e:
+        return path, None, [], f"{os.path.basename(path)}: {e}"
+
+def _process_job(job):
+    return process_file(*job)
+
+def run_batch(paths, stages, workers=1):
+    # Streams (path, result, trace, error) per image in input order
+    jobs = ((path, stages) for path in paths)
+    if workers == 1:
+        yield from map(_process_job, jobs)
+        return
+    initializer = tracemalloc.start if tracemalloc.is_tracing() else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        yield from pool.map(_process_job, jobs, chunksize=4)
+
+class StageTotals:
+    def __init__(self):
+        self.images = 0
+        self.stages = {}
+
+    def add(self, trace):
+        self.images += 1
+        for record in trace:
+            totals = self.stages.setdefault(record['stage'], {})
+            for field, value in record.items():
+                if field != 'stage':
+                    totals[field] = totals.get(field, 0) + value
+
+    def lines(self):
+        total_ms = sum(t['ms'] for t in self.stages.values()) or 1
+        traced = any('py_peak' in t for t in self.stages.values())
+        yield (f"{'stage':<18} {'total ms':>10} {'share':>6} {'ms/img':>8} {'MB in':>9} {'MB out':>9} {'images':>7} {'blocks':>7}"
+               + (f" {'py peak KB':>10}" if traced else ""))
+        for name, t in sorted(self.stages.items(), key=lambda kv: -kv[1]['ms']):
+            yield (f"{name:<18} {t['ms']:>10.1f} {t['ms'] / total_ms:>6.0%} {t['ms'] / max(self.images, 1):>8.2f} "
+                   f"{t['bytes_in'] / 1e6:>9.2f} {t['bytes_out'] / 1e6:>9.2f} {t['images']:>7} {t['blocks']:>7}"
+                   + (f" {t.get('py_peak', 0) / 1024 / max(self.images, 1):>10.1f}" if traced else ""))
+
+def format_trace(trace):
+    return ", ".join(f"{r['stage']} {r['ms']:.1f}ms {r['bytes_in']}->{r['bytes_out']}B" for r in trace)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run images through the staged background-removal pipeline with a per-stage trace.")
+    parser.add_argument("inputs", nargs="+", help="image files or folders")
+    parser.add_argument("-o", "--out-dir", help="write results here (default: trace only)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="menu")
+    parser.add_argument("--stages", help="comma-separated stage order, overriding the profile's")
+    parser.add_argument("--skip", default="", help="comma-separated stages to leave out")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--trace-alloc", action="store_true", help="also record Python allocation peaks (slower)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every image's trace")
+    args = parser.parse_args(argv)
+
+    order = args.stages.split(",") if args.stages else None
+    try:
+        stages = build_stages(args.profile, order, set(filter(None, args.skip.split(","))))
+    except ValueError as e:
+        sys.exit(str(e))
+    if not stages:
+        sys.exit("No stages left to run")
+    paths = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(os.path.join(item, n) for n in os.listdir(item)
+                                if n.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"))))
+        else:
+            paths.append(item)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    if args.trace_alloc:
+        tracemalloc.start()
+
+    totals = StageTotals()
+    errors = []
+    started = time.perf_counter()
+    for path, result, trace, error in run_batch(paths, stages, args.workers):
+        if error:
+            errors.append(error)
+            continue
+        totals.add(trace)
+        if args.verbose:
+            print(f"{path}: {format_trace(trace)}")
+        if args.out_dir and isinstance(result, (bytes, bytearray)):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            with open(os.path.join(args.out_dir, stem + OUTPUT_SUFFIX.get(stages[-1][0], ".bin")), "wb") as f:
+                f.write(result)
+    elapsed = time.perf_counter() - started
+
+    print(f"Profile {args.profile}: {' -> '.join(name for name, _ in stages)}")
+    for line in totals.lines():
+        print(line)
+    for message in errors[:20]:
+        print(f"  {message}")
+    print(f"Successfully processed {totals.images} images ({len(errors)} failed) in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import runpy
+import argparse
+import cProfile
+import functools
+import tracemalloc
+from collections import Counter
+
+# SIMS_PROFILE=1 writes <entry point>.profile.json (and .txt) in the working
+# directory, SIMS_PROFILE=path/trace.json writes there instead.
+PROFILE_ENV = "SIMS_PROFILE"
+TOP_ENV = "SIMS_PROFILE_TOP"
+MEMORY_ENV = "SIMS_PROFILE_MEMORY"
+
+_session = None
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return _peak_working_set()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _peak_working_set():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+class ProfileSession:
+    def __init__(self, name, top=25, memory=True, frames=1):
+        self.name = name
+        self.top = top
+        self.memory = memory
+        self.frames = frames
+        self.stages = {}
+        self.profile = cProfile.Profile()
+        self.result = None
+
+    def _snapshot(self):
+        # Leave out the snapshots and counters this module itself keeps alive
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start(self.frames)
+            self.snapshot = self._snapshot()
+        self.started = self.last = time.perf_counter()
+        self.profile.enable()
+
+    def mark(self, stage):
+        # Closes the segment that began at the previous mark, like
+        # Timings.Mark in CafePrinter. Repeated names (one per image in a
+        # batch) are summed.
+        self.profile.disable()
+        now = time.perf_counter()
+        entry = self.stages.setdefault(stage, {'calls': 0, 'ms': 0.0, 'alloc_bytes': 0, 'peak_bytes': 0,
+                                               'growth': Counter()})
+        entry['calls'] += 1
+        entry['ms'] += (now - self.last) * 1000
+        if self.memory:
+            snapshot = self._snapshot()
+            for diff in snapshot.compare_to(self.snapshot, "lineno"):
+                if diff.size_diff:
+                    frame = diff.traceback[0]
+                    entry['growth'][f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+                    entry['alloc_bytes'] += diff.size_diff
+            entry['peak_bytes'] = max(entry['peak_bytes'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.snapshot = snapshot
+        # Snapshots are slow; keep their cost out of the next stage's time
+        self.last = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        if self.stages:
+            self.mark("(unmarked)")
+        self.profile.disable()
+        wall_ms = (time.perf_counter() - self.started) * 1000
+        if self.memory:
+            tracemalloc.stop()
+        stats = pstats.Stats(self.profile, stream=io.StringIO()).sort_stats("cumulative")
+        functions = []
+        for func in stats.fcn_list[:self.top]:
+            calls, total_calls, tottime, cumtime, _ = stats.stats[func]
+            functions.append({'function': f"{func[0]}:{func[1]}({func[2]})", 'calls': total_calls,
+                              'tottime_ms': tottime * 1000, 'cumtime_ms': cumtime * 1000})
+        stages = []
+        for stage, entry in self.stages.items():
+            stages.append({
+                'stage': stage, 'calls': entry['calls'], 'ms': entry['ms'],
+                'alloc_bytes': entry['alloc_bytes'], 'peak_bytes': entry['peak_bytes'],
+                'top_growth': [{'line': line, 'bytes': size}
+                               for line, size in entry['growth'].most_common(min(self.top, 10))],
+            })
+        self.result = {
+            'entry': self.name,
+            'argv': sys.argv,
+            'python': sys.version.split()[0],
+            'wall_ms': wall_ms,
+            # Time spent taking snapshots between stages, already left out
+            # of the per-stage figures
+            'profiler_overhead_ms': wall_ms - sum(s['ms'] for s in stages) if stages else 0.0,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'memory_traced': self.memory,
+            'stages': stages,
+            'functions': functions,
+        }
+        return self.result
+
+    def summary(self):
+        r = self.result
+        rss = r['peak_rss_bytes']
+        lines = [f"Profile of {r['entry']}: {r['wall_ms']:.0f} ms wall "
+                 f"({r['profiler_overhead_ms']:.0f} ms of it profiler overhead), peak RSS "
+                 + (f"{rss / 1048576:.1f} MB" if rss else "n/a")]
+        memory = r['memory_traced']
+        if r['stages']:
+            lines.append(f"  {'stage':<20} {'calls':>6} {'ms':>10}" + (f" {'alloc KB':>10} {'peak KB':>10}" if memory else ""))
+            for s in r['stages']:
+                lines.append(f"  {s['stage']:<20} {s['calls']:>6} {s['ms']:>10.1f}"
+                             + (f" {s['alloc_bytes'] / 1024:>10.1f} {s['peak_bytes'] / 1024:>10.1f}" if memory else ""))
+                for g in s['top_growth'][:3]:
+                    lines.append(f"      {g['bytes'] / 1024:>+9.1f} KB  {g['line']}")
+        lines.append(f"  top {len(r['functions'])} functions by cumulative time:")
+        for f in r['functions']:
+            lines.append(f"  {f['cumtime_ms']:>10.1f} ms {f['tottime_ms']:>10.1f} ms {f['calls']:>8}  {f['function']}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        if not path.endswith(".json"):
+            path = f"{self.name}.profile.json"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.result, f, indent=2)
+        summary = self.summary()
+        with open(path[:-5] + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        print(summary, file=sys.stderr)
+        print(f"Profile trace written to {path}", file=sys.stderr)
+        return path
+
+def _env_session(name):
+    return ProfileSession(name, top=int(os.environ.get(TOP_ENV, 25)),
+                          memory=os.environ.get(MEMORY_ENV, "1") != "0")
+
+def profiled(name=None):
+    # Decides once, at import: without SIMS_PROFILE the function is returned
+    # untouched, so a disabled profiler costs nothing per call.
+    def decorate(fn):
+        if not os.environ.get(PROFILE_ENV):
+            return fn
+        entry = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _session
+            if _session is not None:
+                return fn(*args, **kwargs)
+            _session = _env_session(entry)
+            _session.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                session, _session = _session, None
+                session.stop()
+                session.write(os.environ[PROFILE_ENV])
+        return wrapper
+    return decorate
+
+def mark(stage):
+    if _session is not None:
+        _session.mark(stage)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script under cProfile and tracemalloc and write a JSON trace plus a summary.",
+                                     usage="%(prog)s [options] script.py [script args ...]")
+    parser.add_argument("-o", "--output", help="trace path (default: <script>.profile.json)")
+    parser.add_argument("--top", type=int, default=25, help="functions to keep, by cumulative time")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (much lower overhead)")
+    parser.add_argument("--frames", type=int, default=1, help="traceback depth kept by tracemalloc")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    global _session
+    # This file runs as __main__; register it as 'profiling' so the script's
+    # own import finds the live session instead of a second, idle copy.
+    sys.modules.setdefault("profiling", sys.modules[__name__])
+    name = os.path.splitext(os.path.basename(args.script))[0]
+    # Set before the script is imported so its @profiled entry points are
+    # wrapped; they see the running session and only add their marks.
+    os.environ[PROFILE_ENV] = args.output or "1"
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    _session = ProfileSession(name, args.top, not args.no_memory, args.frames)
+    _session.start()
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    finally:
+        session, _session = _session, None
+        session.stop()
+        session.write(args.output or "")
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,43 @@
+from PIL import Image, ImageChops
 
-import os
-from PIL import Image
+from profiling import profiled, mark
 
-def remove_background(input_path, output_path):
-    try:
-        img = Image.open(input_path)
-        img = img.convert("RGBA")
-        datas = img.getdata()
+def key_white_background(img, threshold=200):
+    img = img.convert("RGBA")
+    # Change all white (also shades of whites)
+    # Find all pixels that are white-ish (R>200, G>200, B>200)
+    r, g, b, _ = img.split()
+    lut = [255 if v > threshold else 0 for v in range(256)]
+    mask = ImageChops.multiply(ImageChops.multiply(r.point(lut), g.point(lut)), b.point(lut))
+    clear = Image.new("RGBA", img.size, (255, 255, 255, 0))
+    return Image.composite(clear, img, mask)
 
-        newData = []
-        for item in datas:
-            # Change all white (also shades of whites)
-            # Find all pixels that are white-ish (R>200, G>200, B>200)
-            if item[0] > 200 and item[1] > 200 and item[2] > 200:
-                newData.append((255, 255, 255, 0))
-            else:
-                newData.append(item)
+def crop_to_content(img):
+    # Crop the image to the non-transparent area
+    bbox = img.getbbox()
+    if bbox:
+        img = img.crop(bbox)
+    return img
 
-        img.putdata(newData)
-        
-        # Crop the image to the non-transparent area
-        bbox = img.getbbox()
-        if bbox:
-            img = img.crop(bbox)
-            
-        img.save(output_path, "PNG")
-        print(f"Successfully processed {input_path} to {output_path}")
+@profiled("remove_background")
+def remove_background(input_path, output_path, profile="icon"):
+    # The steps live in image_pipeline so batch runs can reorder or skip them
+    from image_pipeline import build_stages, run_pipeline, format_trace
+    try:
+        with open(input_path, "rb") as f:
+            data = f.read()
+        mark("read")
+        data, trace = run_pipeline(data, build_stages(profile))
+        with open(output_path, "wb") as f:
+            f.write(data)
+        mark("write")
+        print(f"Successfully processed {input_path} to {output_path} ({format_trace(trace)})")
     except Exception as e:
         print(f"Error processing image: {e}")
 
-input_icon = r"c:\Users\rinzy\Desktop\PROJECTS\Cafe Management\cafeapp\assets\icon\icon_backup.png"
-output_icon = r"c:\Users\rinzy\Desktop\PROJECTS\Cafe Management\cafeapp\assets\icon\icon.png"
+if __name__ == '__main__':
+    input_icon = r"c:\Users\rinzy\Desktop\PROJECTS\Cafe Management\cafeapp\assets\icon\icon_backup.png"
+    output_icon = r"c:\Users\rinzy\Desktop\PROJECTS\Cafe Management\cafeapp\assets\icon\icon.png"
 
-# Use the backup as source since we backed it up in step 0
-remove_background(input_icon, output_icon)
+    # Use the backup as source since we backed it up in step 0
+    remove_background(input_icon, output_icon)
@@ -0,0 +1,405 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from datetime import date, timedelta
+
+from cafe_schema import DATABASES, ORDERS_DB, MENU_DB, PERSONS_DB, CREDIT_DB, EXPENSES_DB, DELIVERY_BOYS_DB
+from cafe_queries import EXPORT_SQL, ORDER_COLUMNS_SQL, ITEM_COLUMNS_SQL, TRANSACTIONS_SQL
+
+# Representative statements per database: the report scripts' own SQL plus
+# the queries the app's repositories and LanSyncEngine run most. Parameters
+# starting with ':' are filled from SAMPLES so every query selects real rows.
+# The last field is the index worth trying when the plan scans or sorts.
+QUERIES = {
+    ORDERS_DB: [
+        ("day-end export", EXPORT_SQL, (":day", ":next_day"), None),
+        ("analytics orders", ORDER_COLUMNS_SQL, (":month", ":next_day", "completed"), None),
+        ("analytics items", ITEM_COLUMNS_SQL, (":month", ":next_day", "completed"), None),
+        ("orders page", "SELECT * FROM orders ORDER BY created_at DESC LIMIT 200", (), None),
+        ("pending count", "SELECT COUNT(*) FROM orders WHERE status = 'pending'", (), ("orders", ("status",))),
+        ("unsynced orders", "SELECT * FROM orders WHERE is_synced = ? ORDER BY created_at DESC", (0,),
+         ("orders", ("is_synced", "created_at"))),
+        ("staff order lookup", "SELECT * FROM orders WHERE staff_device_id = ? AND staff_order_number = ?",
+         (":device", ":staff_number"), ("orders", ("staff_device_id", "staff_order_number"))),
+        ("event deposits", "SELECT * FROM orders WHERE deposit_amount > 0 ORDER BY event_date ASC, created_at DESC",
+         (), None),
+        ("sync changes", "SELECT * FROM orders WHERE updated_at > ?", (":since",), ("orders", ("updated_at",))),
+        ("sync order items", "SELECT * FROM order_items WHERE order_id = ?", (":order_id",),
+         ("order_items", ("order_id",))),
+    ],
+    MENU_DB: [
+        ("menu load", "SELECT * FROM menu_items WHERE isDeleted = ?", (0,), None),
+        ("categories", "SELECT DISTINCT category FROM menu_items WHERE isDeleted = 0", (), None),
+        ("category items", "SELECT * FROM menu_items WHERE category = ? AND isDeleted = ?", (":category", 0),
+         ("menu_items", ("category",))),
+        ("sync changes", "SELECT * FROM menu_items WHERE lastUpdated > ?", (":since",),
+         ("menu_items", ("lastUpdated",))),
+    ],
+    PERSONS_DB: [
+        ("active customers", "SELECT * FROM persons WHERE is_deleted = ?", (0,), None),
+        ("sync changes", "SELECT * FROM persons WHERE updated_at > ?", (":since",), ("persons", ("updated_at",))),
+    ],
+    CREDIT_DB: [
+        ("khata statements", TRANSACTIONS_SQL, (":next_day",), ("credit_transactions", ("customerId", "createdAt"))),
+        ("customer open credits",
+         "SELECT * FROM credit_transactions WHERE customerId = ? AND isCompleted = ? ORDER BY createdAt DESC",
+         (":customer", 0), ("credit_transactions", ("customerId", "isCompleted", "createdAt"))),
+        ("sync changes", "SELECT * FROM credit_transactions WHERE updated_at > ?", (":since",),
+         ("credit_transactions", ("updated_at",))),
+    ],
+    EXPENSES_DB: [
+        ("expense list", "SELECT * FROM expenses ORDER BY date DESC", (), ("expenses", ("date",))),
+        ("expense items", "SELECT * FROM expense_items WHERE expense_id = ?", (":expense_id",),
+         ("expense_items", ("expense_id",))),
+    ],
+    DELIVERY_BOYS_DB: [
+        ("active delivery boys", "SELECT * FROM delivery_boys WHERE is_deleted = ?", (0,), None),
+        ("sync changes", "SELECT * FROM delivery_boys WHERE updated_at > ?", (":since",),
+         ("delivery_boys", ("updated_at",))),
+    ],
+}
+
+# ':day' is the latest business day in the file; ':next_day' and ':month'
+# (30 days back) are derived from it. ':since' is the latest change day, so
+# a sync replay pulls about one day of changes.
+SAMPLES = {
+    ORDERS_DB: {
+        'day': "SELECT substr(MAX(created_at), 1, 10) FROM orders",
+        'since': "SELECT substr(MAX(updated_at), 1, 10) FROM orders",
+        'order_id': "SELECT MAX(id) FROM orders",
+        'device': "SELECT staff_device_id FROM orders ORDER BY id DESC LIMIT 1",
+        'staff_number': "SELECT staff_order_number FROM orders ORDER BY id DESC LIMIT 1",
+    },
+    MENU_DB: {
+        'category': "SELECT category FROM menu_items WHERE isDeleted = 0 LIMIT 1",
+        'since': "SELECT substr(MAX(lastUpdated), 1, 10) FROM menu_items",
+    },
+    PERSONS_DB: {
+        'since': "SELECT substr(MAX(updated_at), 1, 10) FROM persons",
+    },
+    CREDIT_DB: {
+        'day': "SELECT substr(MAX(createdAt), 1, 10) FROM credit_transactions",
+        'since': "SELECT substr(MAX(updated_at), 1, 10) FROM credit_transactions",
+        'customer': "SELECT customerId FROM credit_transactions ORDER BY rowid DESC LIMIT 1",
+    },
+    EXPENSES_DB: {
+        'expense_id': "SELECT MAX(id) FROM expenses",
+    },
+    DELIVERY_BOYS_DB: {
+        'since': "SELECT substr(MAX(updated_at), 1, 10) FROM delivery_boys",
+    },
+}
+
+# What-if indexes must beat the current plan by this much, and save at
+# least this long, to be suggested; tiny tables are fine as they are
+MIN_SPEEDUP = 1.25
+MIN_SAVING_MS = 0.5
+# A query counts as slower after ANALYZE past this factor and by at least
+# this long; run-to-run noise reaches 1.3x, and doubles on sub-ms queries
+MAX_SLOWDOWN = 1.5
+MAX_SLOWDOWN_MS = 5.0
+
+LIMIT_CLAUSE = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def file_sizes(path):
+    wal = path + "-wal"
+    return os.path.getsize(path), os.path.getsize(wal) if os.path.exists(wal) else 0
+
+def load_samples(conn, name):
+    samples = {}
+    for key, sql in SAMPLES.get(name, {}).items():
+        try:
+            row = conn.execute(sql).fetchone()
+        except sqlite3.OperationalError:
+            continue
+        if row and row[0] is not None:
+            samples[key] = row[0]
+    try:
+        day = date.fromisoformat(samples.get('day', ""))
+    except ValueError:
+        day = date.today()
+    samples.update(day=day.isoformat(), next_day=(day + timedelta(days=1)).isoformat(),
+                   month=(day - timedelta(days=30)).isoformat())
+    samples.setdefault('since', samples['day'])
+    return samples
+
+def bind_queries(conn, name):
+    samples = load_samples(conn, name)
+    bound = []
+    for label, sql, params, candidate in QUERIES.get(name, []):
+        values = tuple(samples.get(p[1:]) if isinstance(p, str) and p.startswith(":") else p for p in params)
+        bound.append((label, sql, values, candidate))
+    return bound
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def plan_problems(plan, sql):
+    # A SCAN reads the whole table, in index order or not, and a temp b-tree
+    # is a sort of the result; both grow with the table, not with the answer.
+    # An index scan under a LIMIT stops after the first rows, so it is fine.
+    limited = LIMIT_CLAUSE.search(sql) is not None
+    return [step for step in plan
+            if (step.startswith("SCAN ") and "CONSTANT ROW" not in step
+                and not (limited and " INDEX " in step))
+            or "TEMP B-TREE" in step]
+
+def time_query(conn, sql, params, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = 0
+        for _ in conn.execute(sql, params):
+            rows += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+def measure(conn, queries, repeat):
+    results = {}
+    for label, sql, params, _ in queries:
+        try:
+            ms, rows = time_query(conn, sql, params, repeat)
+            plan = query_plan(conn, sql, params)
+        except sqlite3.OperationalError as e:
+            results[label] = {'error': str(e)}
+            continue
+        results[label] = {'ms': ms, 'rows': rows, 'plan': plan, 'problems': plan_problems(plan, sql)}
+    return results
+
+def slowdowns(before, after):
+    slower = []
+    for label, old in before.items():
+        new = after.get(label, {})
+        if ('ms' in old and 'ms' in new and new['ms'] > old['ms'] * MAX_SLOWDOWN
+                and new['ms'] - old['ms'] >= MAX_SLOWDOWN_MS):
+            slower.append(label)
+    return slower
+
+def has_index(conn, table, columns):
+    # Any index whose leading columns are the candidate's already serves it
+    for index in conn.execute(f"PRAGMA index_list({quote(table)})").fetchall():
+        indexed = [row[2] for row in conn.execute(f"PRAGMA index_info({quote(index[1])})")]
+        if indexed[:len(columns)] == list(columns):
+            return True
+    return False
+
+def index_sql(table, columns):
+    # Same naming as the app's own idx_orders_created_at
+    name = "idx_" + "_".join((table,) + tuple(columns))
+    return name, f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(quote(c) for c in columns)})"
+
+def advise(conn, queries, measured, repeat):
+    # Tries every candidate index no existing index covers inside a savepoint
+    # that is rolled back, and keeps it only if the planner picks it and the
+    # query gets measurably faster. Plans that look fine are tried too: a
+    # SEARCH on a low-selectivity prefix (idx_orders_staff_device for a
+    # device + number lookup) only shows up in the timing.
+    suggestions = {}
+    for label, sql, params, candidate in queries:
+        current = measured.get(label, {})
+        if not candidate or 'ms' not in current:
+            continue
+        table, columns = candidate
+        if has_index(conn, table, columns):
+            continue
+        name, ddl = index_sql(table, columns)
+        conn.execute("SAVEPOINT what_if")
+        try:
+            conn.execute(ddl)
+            conn.execute(f"ANALYZE {name}")
+            plan = query_plan(conn, sql, params)
+            ms, _ = time_query(conn, sql, params, repeat)
+        finally:
+            conn.execute("ROLLBACK TO what_if")
+            conn.execute("RELEASE what_if")
+        if (any(name in step for step in plan) and ms * MIN_SPEEDUP < current['ms']
+                and current['ms'] - ms >= MIN_SAVING_MS):
+            entry = suggestions.setdefault(ddl, {'sql': ddl, 'queries': []})
+            entry['queries'].append({'query': label, 'ms': current['ms'], 'with_index_ms': ms})
+    return list(suggestions.values())
+
+def lock_original(path):
+    # A write lock on the original, held from before VACUUM INTO until the
+    # copy is swapped in, so nothing written to it meanwhile is lost with
+    # the .bak. Readers are not blocked. None if a writer already has it.
+    guard = sqlite3.connect(path, isolation_level=None, timeout=5)
+    try:
+        guard.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError:
+        guard.close()
+        return None
+    return guard
+
+def maintain(path, out_dir, repeat=3, vacuum=True, apply=False, replace=False):
+    name = os.path.basename(path)
+    result = {'database': name, 'path': path}
+    result['size_before'], result['wal_before'] = file_sizes(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    guard = None
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        result['free_bytes'] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        queries = bind_queries(conn, name)
+        result['before'] = measure(conn, queries, repeat)
+        # busy is 1 when an open reader kept part of the WAL from being copied
+        busy, log_frames, copied = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        result['checkpoint'] = {'busy': busy, 'wal_frames': log_frames, 'copied_frames': copied}
+        if vacuum:
+            target = os.path.join(out_dir, name)
+            if os.path.abspath(target) == os.path.abspath(path):
+                sys.exit(f"The output folder must not hold the originals: {out_dir}")
+            os.makedirs(out_dir, exist_ok=True)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(target + suffix):
+                    os.remove(target + suffix)
+            if replace:
+                guard = lock_original(path)
+                result['locked'] = guard is not None
+            started = time.perf_counter()
+            # Writes a defragmented copy; the original is never rewritten
+            conn.execute("VACUUM INTO ?", (target,))
+            result['vacuum_seconds'] = time.perf_counter() - started
+            conn.close()
+            conn = sqlite3.connect(target, isolation_level=None)
+            # Every repository opens its database in WAL mode
+            conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            target = path
+        # New statistics can steer the planner off a good index (is_synced
+        # onto a full created_at scan), so ANALYZE and any applied indexes
+        # are only committed if no query got slower than it was before.
+        conn.execute("BEGIN")
+        try:
+            started = time.perf_counter()
+            conn.execute("ANALYZE")
+            result['analyze_seconds'] = time.perf_counter() - started
+            measured = measure(conn, queries, repeat)
+            result['suggestions'] = advise(conn, queries, measured, repeat)
+            if apply and result['suggestions']:
+                for suggestion in result['suggestions']:
+                    conn.execute(suggestion['sql'])
+                conn.execute("ANALYZE")
+                measured = measure(conn, queries, repeat)
+            result['after'] = measured
+            result['slower'] = slowdowns(result['before'], measured)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("ROLLBACK" if result['slower'] else "COMMIT")
+        conn.close()
+        result['size_after'], result['wal_after'] = file_sizes(target)
+        if replace and target != path:
+            refused = []
+            if result['checkpoint']['busy']:
+                refused.append("another connection kept the WAL busy, close the app first")
+            if not result['locked']:
+                refused.append("another connection was writing, close the app first")
+            if result['slower']:
+                refused.append("queries got slower: " + ", ".join(result['slower']))
+            result['replaced'] = not refused
+            if refused:
+                result['not_replaced'] = "; ".join(refused)
+            else:
+                # Only with the app closed: the original and its WAL files are
+                # kept next to it as .bak, .bak-wal and .bak-shm
+                os.replace(path, path + ".bak")
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.replace(path + suffix, path + ".bak" + suffix)
+                os.replace(target, path)
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(target + suffix):
+                        os.remove(target + suffix)
+    finally:
+        conn.close()
+        if guard is not None:
+            guard.execute("ROLLBACK")
+            guard.close()
+    return result
+
+def find_databases(paths):
+    found = []
+    for item in paths or ["."]:
+        if os.path.isdir(item):
+            found.extend(os.path.join(item, n) for n in DATABASES if os.path.exists(os.path.join(item, n)))
+        elif os.path.exists(item):
+            found.append(item)
+        else:
+            sys.exit(f"Database not found: {item}")
+    return found
+
+def _mb(size):
+    return f"{size / 1048576:.1f} MB"
+
+def print_result(r):
+    wal = f" + {_mb(r['wal_before'])} WAL" if r['wal_before'] else ""
+    checkpoint = r['checkpoint']
+    if checkpoint['wal_frames'] < 0:
+        checkpoint = "not in WAL mode"
+    else:
+        checkpoint = (f"checkpoint copied {checkpoint['copied_frames']} of {checkpoint['wal_frames']} frames"
+                      + (" (readers kept it busy)" if checkpoint['busy'] else ""))
+    print(f"{r['database']}: {_mb(r['size_before'])}{wal} -> {_mb(r['size_after'] + r['wal_after'])}, "
+          f"{_mb(r['free_bytes'])} free pages; {checkpoint}")
+    if r['before']:
+        print(f"  {'query':<24} {'rows':>9} {'before ms':>10} {'after ms':>10}  plan")
+    for label, before in r['before'].items():
+        after = r['after'].get(label, {})
+        if 'error' in before or 'error' in after:
+            print(f"  {label:<24} {'':>9} {'':>10} {'':>10}  {before.get('error') or after.get('error')}")
+            continue
+        flagged = (["SLOWER"] if label in r['slower'] else []) + after['problems']
+        print(f"  {label:<24} {after['rows']:>9} {before['ms']:>10.2f} {after['ms']:>10.2f}  "
+              f"{'; '.join(flagged) or 'ok'}")
+    for s in r['suggestions']:
+        gains = ", ".join(f"{q['query']} {q['ms']:.2f} -> {q['with_index_ms']:.2f} ms" for q in s['queries'])
+        print(f"  suggest: {s['sql']};  -- {gains}")
+    if r['slower']:
+        print(f"  slower after ANALYZE: {', '.join(r['slower'])}; statistics and indexes rolled back")
+    if r.get('not_replaced'):
+        print(f"  not replaced: {r['not_replaced']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkpoint, compact and analyze the cafe databases and suggest "
+                                                 "missing indexes from the plans of the report and sync queries.")
+    parser.add_argument("paths", nargs="*", help="database files or folders holding them (default: current folder)")
+    parser.add_argument("-o", "--out-dir", default="compacted", help="where VACUUM INTO writes the fresh copies")
+    parser.add_argument("--no-vacuum", action="store_true",
+                        help="only checkpoint and ANALYZE the originals in place (holds a write lock while measuring)")
+    parser.add_argument("--apply-indexes", action="store_true", help="create the suggested indexes in the result")
+    parser.add_argument("--replace", action="store_true",
+                        help="swap the compacted copies in for the originals (app closed), keeping .bak files")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; the best time is reported")
+    parser.add_argument("--json", help="also write the full results, with query plans, to this file")
+    args = parser.parse_args(argv)
+
+    if args.replace and args.no_vacuum:
+        sys.exit("--replace needs the compacted copies; drop --no-vacuum")
+    paths = find_databases(args.paths)
+    if not paths:
+        sys.exit("No cafe databases found")
+    started = time.perf_counter()
+    results = []
+    for path in paths:
+        print(f"Maintaining {path}", file=sys.stderr)
+        result = maintain(path, args.out_dir, args.repeat, not args.no_vacuum, args.apply_indexes, args.replace)
+        print_result(result)
+        results.append(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    before = sum(r['size_before'] + r['wal_before'] for r in results)
+    after = sum(r['size_after'] + r['wal_after'] for r in results)
+    print(f"Successfully maintained {len(results)} databases: {_mb(before)} -> {_mb(after)} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
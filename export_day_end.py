@@ -0,0 +1,137 @@
+import os
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from cafe_schema import ORDERS_DB
+from cafe_queries import EXPORT_SQL
+
+HEADER = [
+    "Order ID", "Bill No", "Staff No", "Created At", "Service Type", "Status", "Payment Method",
+    "Cash", "Bank", "Customer", "Subtotal", "Tax", "Discount", "Delivery Charge", "Order Total",
+    "Item ID", "Item", "Price", "Qty", "Line Total", "Cost", "Line Cost", "Tax Exempt", "Kitchen Note",
+]
+
+def iter_export_rows(db_path, start, end, fetch_size=2000):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(EXPORT_SQL, (start, end))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def write_csv(path, rows):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def write_xlsx(path, rows, sheet_title="Sales"):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    # write_only spills each appended row to a temp file, so the workbook
+    # never holds more than the current row. Serialising is the slow part;
+    # openpyxl picks up lxml when it is installed and writes faster.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    ws.freeze_panes = "A2"
+    bold = Font(bold=True)
+    header = []
+    for title in HEADER:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+    wb.save(path)
+    return count
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx}
+
+def store_name(db_path):
+    # Several stores are usually several copies of cafe_orders.db in
+    # per-store folders; name the output after the folder then.
+    base = os.path.basename(db_path)
+    if base == ORDERS_DB:
+        return os.path.basename(os.path.dirname(os.path.abspath(db_path))) or "store"
+    return os.path.splitext(base)[0]
+
+def export_job(job):
+    db_path, start, end, out_path, fmt = job
+    started = time.perf_counter()
+    count = WRITERS[fmt](out_path, iter_export_rows(db_path, start, end))
+    return out_path, count, time.perf_counter() - started
+
+def plan_jobs(db_paths, first_day, last_day, out_dir, fmt, per_day=True):
+    jobs = []
+    for db_path in db_paths:
+        store = store_name(db_path)
+        if per_day:
+            day = first_day
+            while day <= last_day:
+                out = os.path.join(out_dir, f"{store}_{day.isoformat()}.{fmt}")
+                jobs.append((db_path, day.isoformat(), (day + timedelta(days=1)).isoformat(), out, fmt))
+                day += timedelta(days=1)
+        else:
+            out = os.path.join(out_dir, f"{store}_{first_day.isoformat()}_{last_day.isoformat()}.{fmt}")
+            jobs.append((db_path, first_day.isoformat(), (last_day + timedelta(days=1)).isoformat(), out, fmt))
+    return jobs
+
+def run_jobs(jobs, workers=None):
+    if workers == 1 or len(jobs) == 1:
+        yield from map(export_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(export_job, jobs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export day-end sales (orders joined with their items) to CSV or XLSX.")
+    parser.add_argument("dbs", nargs="*", default=[ORDERS_DB], help="one cafe_orders.db per store")
+    parser.add_argument("--date", help="day to export, YYYY-MM-DD (default: today)")
+    parser.add_argument("--from", dest="first", help="first day of a range, YYYY-MM-DD")
+    parser.add_argument("--to", dest="last", help="last day of a range, inclusive")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="xlsx")
+    parser.add_argument("--single", action="store_true", help="one file per store for the whole range instead of one per day")
+    parser.add_argument("-o", "--out-dir", default="exports")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        first = date.fromisoformat(args.first or args.date or date.today().isoformat())
+        last = date.fromisoformat(args.last or args.first or args.date or first.isoformat())
+    except ValueError as e:
+        sys.exit(f"Invalid date: {e}")
+    if last < first:
+        sys.exit("--to is before --from")
+    for db_path in args.dbs:
+        if not os.path.exists(db_path):
+            sys.exit(f"Database not found: {db_path}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = plan_jobs(args.dbs, first, last, args.out_dir, args.format, per_day=not args.single)
+    started = time.perf_counter()
+    total = 0
+    for out_path, count, seconds in run_jobs(jobs, args.workers):
+        total += count
+        print(f"  {out_path}: {count} rows in {seconds:.2f}s")
+    print(f"Successfully exported {total} rows to {len(jobs)} files in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import calendar
+import itertools
+from datetime import date, timedelta
+
+from cafe_schema import (DATABASES, ORDERS_DB, MENU_DB, PERSONS_DB, CREDIT_DB, EXPENSES_DB, DELIVERY_BOYS_DB,
+                         ORDER_INDEXES, create_schema)
+
+# Category: (price range, items). Prices are in rial, three decimals like
+# the app's currency setting.
+MENU = {
+    'Coffee': ((0.6, 1.8), ["Espresso", "Americano", "Cappuccino", "Latte", "Flat White", "Mocha", "Spanish Latte",
+                            "Turkish Coffee", "Arabic Coffee", "Iced Latte", "Cold Brew", "Caramel Macchiato"]),
+    'Tea': ((0.2, 1.0), ["Karak Chai", "Masala Chai", "Ginger Tea", "Green Tea", "Lemon Tea", "Sulaimani",
+                         "Zafran Chai", "Iced Tea"]),
+    'Juices': ((0.8, 1.8), ["Orange Juice", "Lemon Mint", "Avocado Shake", "Mango Juice", "Watermelon Juice",
+                            "Strawberry Shake", "Pineapple Juice", "Mixed Fruit Cocktail"]),
+    'Breakfast': ((0.5, 2.5), ["Chips Oman Roll", "Egg Paratha", "Shakshuka", "Foul Medames", "Cheese Omelette",
+                               "Masala Dosa", "Chapati with Honey", "Pancakes"]),
+    'Sandwiches': ((0.7, 2.2), ["Club Sandwich", "Zinger Sandwich", "Falafel Wrap", "Chicken Shawarma",
+                                "Tuna Sandwich", "Halloumi Panini", "Egg Mayo Sandwich", "Beef Shawarma"]),
+    'Burgers': ((1.5, 3.5), ["Classic Beef Burger", "Chicken Burger", "Double Cheese Burger", "Mushroom Swiss Burger",
+                             "Spicy Zinger Burger", "Veggie Burger"]),
+    'Grills': ((2.0, 5.5), ["Mixed Grill", "Chicken Tikka", "Shish Tawook", "Lamb Kebab", "Grilled Hammour",
+                            "Mishkak Platter"]),
+    'Rice': ((1.8, 4.5), ["Chicken Biryani", "Mutton Biryani", "Chicken Machboos", "Fish Curry Rice",
+                          "Vegetable Pulao", "Shuwa Rice"]),
+    'Desserts': ((0.8, 2.5), ["Kunafa", "Umm Ali", "Chocolate Cake", "Cheesecake", "Luqaimat", "Halwa Cup",
+                              "Ice Cream Scoop"]),
+    'Drinks': ((0.1, 0.5), ["Water 500ml", "Laban", "Soft Drink", "Sparkling Water"]),
+}
+# Bottled drinks are the usual tax-exempt lines
+TAX_EXEMPT = {"Water 500ml", "Laban"}
+
+FIRST_NAMES = ["Ahmed", "Mohammed", "Salim", "Khalid", "Said", "Hamad", "Ali", "Yousuf", "Fatma", "Aisha", "Maryam",
+               "Zainab", "Rashid", "Nasser", "Sultan", "Hilal", "Ravi", "Suresh", "Anil", "Joseph", "Priya", "Meera",
+               "Imran", "Faisal", "Omar", "Layla", "Noor", "Huda", "Badar", "Talal"]
+LAST_NAMES = ["Al Balushi", "Al Hinai", "Al Harthy", "Al Busaidi", "Al Rawahi", "Al Kindi", "Al Saadi", "Al Maskari",
+              "Al Riyami", "Al Lawati", "Nair", "Menon", "Pillai", "Khan", "Sheikh", "Fernandes", "Thomas", "Varghese"]
+PLACES = ["Muscat", "Ruwi", "Seeb", "Muttrah", "Qurum", "Al Khuwair", "Bausher", "Ghubra", "Mabela", "Al Amerat",
+          "Barka", "Sohar", "Nizwa", "Sur"]
+KITCHEN_NOTES = ["Less sugar", "No sugar", "Extra spicy", "No onion", "Less ice", "Well done", "Extra cheese",
+                 "Pack separately"]
+EVENT_TYPES = ["Wedding", "Birthday", "Corporate", "Family Gathering", "Graduation", "Eid Gathering"]
+EXPENSE_ACCOUNTS = {
+    'Raw Materials': ["Vegetables", "Chicken", "Meat", "Fish", "Rice and flour", "Dairy", "Coffee beans", "Spices"],
+    'Kitchen Expenses': ["Gas cylinder", "Cooking oil", "Disposable cups", "Food containers"],
+    'Cleaning Supplies': ["Detergent", "Tissues", "Garbage bags"],
+    'Utilities': ["Electricity", "Water", "Internet"],
+    'Maintenance': ["AC service", "Plumbing", "Coffee machine service"],
+    'Transport': ["Fuel", "Delivery bike service"],
+    'Others': ["Stationery", "Bank charges"],
+}
+
+# (service type, weight); dining picks a table number per order
+SERVICE_TYPES = [("Dining", 44), ("Takeout", 30), ("Delivery", 13), ("Drive Through", 11), ("Catering", 2)]
+PAYMENTS = [("cash", 50), ("bank", 31), ("split", 8), ("credit", 11)]
+# Orders per hour of the day: breakfast, lunch and a long evening peak
+HOUR_WEIGHTS = [2, 1, 0, 0, 0, 1, 4, 9, 12, 10, 7, 8, 12, 13, 9, 6, 6, 8, 11, 14, 15, 13, 9, 5]
+# Monday first; Friday and Saturday are the weekend here
+WEEKDAY_FACTOR = [0.9, 0.88, 0.92, 1.0, 1.32, 1.36, 1.02]
+ITEM_COUNTS = ([1, 2, 3, 4, 5, 6], [30, 30, 19, 11, 6, 4])
+QUANTITIES = ([1, 2, 3, 4], [76, 17, 5, 2])
+TAX_RATE = 0.05
+TABLES = 30
+DEVICES = ["host-0001", "tablet-0002", "tablet-0003"]
+
+ORDER_COLUMNS = ("id", "staff_order_number", "main_order_number", "staff_device_id", "service_type", "subtotal",
+                 "tax", "discount", "total", "status", "created_at", "payment_method", "customer_id", "cash_amount",
+                 "bank_amount", "is_synced", "synced_at", "main_number_assigned", "delivery_charge",
+                 "delivery_address", "delivery_boy", "event_date", "event_time", "event_guest_count", "event_type",
+                 "deposit_amount", "token_number", "customer_name", "updated_at", "is_deleted",
+                 "is_temp_receipt_printed")
+ITEM_COLUMNS = ("order_id", "menu_item_id", "name", "price", "quantity", "kitchen_note", "tax_exempt",
+                "purchase_price")
+
+def insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+def stamp(epoch):
+    # Local time the way Dart's toIso8601String writes it, millisecond precision
+    t = time.gmtime(epoch)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+            f".{int(epoch * 1000) % 1000:03d}")
+
+def day_epoch(day):
+    return calendar.timegm(day.timetuple())
+
+def open_database(out_dir, name, force):
+    path = os.path.join(out_dir, name)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            if not force:
+                sys.exit(f"{path} already exists; pass --force to replace it")
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    # A throwaway file that is rebuilt from the seed: no rollback journal
+    # and no fsync while loading. The app's WAL mode is set once it is full.
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-131072")
+    create_schema(conn, name, indexes=False)
+    return conn
+
+def build_menu(rng, updated):
+    items = []
+    for category, ((low, high), names) in MENU.items():
+        for name in names:
+            price = round(rng.uniform(low, high) * 10) / 10
+            items.append((len(items) + 1, name, price, category, int(name in TAX_EXEMPT),
+                          round(price * rng.uniform(0.3, 0.55), 3)))
+    rows = [(str(i), name, price, "", category, 1, 0, updated, exempt, 0, cost, "", "[]")
+            for i, name, price, category, exempt, cost in items]
+    # Zipf-like popularity: a few favourites sell most of the cups
+    order = list(range(len(items)))
+    rng.shuffle(order)
+    weights = [0.0] * len(items)
+    for rank, i in enumerate(order, 1):
+        weights[i] = 1 / rank ** 0.8
+    return items, rows, list(itertools.accumulate(weights))
+
+def build_people(rng, count, first_day):
+    base = day_epoch(first_day) * 1000
+    people = []
+    for i in range(count):
+        people.append({
+            'id': str(base + i * 1000 + rng.randrange(1000)),
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'phone': f"9{rng.randrange(1000000, 9999999)}",
+            'place': rng.choice(PLACES),
+            'credit': 0.0,
+            'visited': None,
+            'updated': None,
+        })
+    return people
+
+def build_riders(rng, count, updated):
+    return [(f"rider-{i + 1:02d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+             f"9{rng.randrange(1000000, 9999999)}", updated, 0) for i in range(count)]
+
+class OrderDay:
+    # Builds one business day of orders. Everything random is drawn in
+    # bulk per day (hours, service types, payments, items), which keeps the
+    # per-order Python work to formatting and arithmetic.
+    def __init__(self, rng, menu, menu_weights, people, riders, end_epoch):
+        self.rng = rng
+        self.menu = menu
+        self.menu_weights = menu_weights
+        self.people = people
+        self.riders = riders
+        self.end_epoch = end_epoch
+        self.order_id = 0
+        self.staff_numbers = dict.fromkeys(DEVICES, 0)
+        self.credit_id = 0
+
+    def generate(self, day, count, last_day):
+        rng = self.rng
+        start = day_epoch(day)
+        hours = rng.choices(range(24), HOUR_WEIGHTS, k=count)
+        moments = sorted(start + h * 3600 + rng.random() * 3600 for h in hours)
+        services = rng.choices([s for s, _ in SERVICE_TYPES], [w for _, w in SERVICE_TYPES], k=count)
+        payments = rng.choices([p for p, _ in PAYMENTS], [w for _, w in PAYMENTS], k=count)
+        # Catering orders are a few dishes in bulk
+        line_counts = [rng.randrange(4, 10) if service == "Catering" else lines
+                       for service, lines in zip(services, rng.choices(*ITEM_COUNTS, k=count))]
+        picks = iter(rng.choices(self.menu, cum_weights=self.menu_weights, k=sum(line_counts)))
+        quantities = iter(rng.choices(*QUANTITIES, k=sum(line_counts)))
+        orders, items, credits = [], [], []
+        token = 0
+        for moment, service, payment, lines in zip(moments, services, payments, line_counts):
+            self.order_id += 1
+            order_id = self.order_id
+            device = DEVICES[0] if rng.random() < 0.5 else rng.choice(DEVICES[1:])
+            self.staff_numbers[device] += 1
+            created = stamp(moment)
+            catering = service == "Catering"
+            subtotal = taxable = 0.0
+            for _ in range(lines):
+                item = next(picks)
+                quantity = next(quantities)
+                if catering:
+                    quantity = rng.randrange(10, 60)
+                note = rng.choice(KITCHEN_NOTES) if rng.random() < 0.05 else ""
+                items.append((order_id, item[0], item[1], item[2], quantity, note, item[4], item[5]))
+                subtotal += item[2] * quantity
+                if not item[4]:
+                    taxable += item[2] * quantity
+            discount = round(subtotal * rng.choice((0.05, 0.1, 0.15)), 3) if rng.random() < 0.04 else 0.0
+            tax = round(taxable * (1 - discount / subtotal) * TAX_RATE, 3)
+            delivery_charge = address = rider = event_date = event_time = guests = event_type = deposit = None
+            token_number = None
+            if service == "Dining":
+                service = f"Dining - Table {rng.randrange(1, TABLES + 1)}"
+            elif service in ("Takeout", "Drive Through"):
+                token += 1
+                token_number = str(token)
+            elif service == "Delivery":
+                delivery_charge = rng.choice((0.3, 0.5, 1.0))
+                address = f"{rng.choice(PLACES)}, Building {rng.randrange(1, 400)}, Flat {rng.randrange(1, 40)}"
+                rider = rng.choice(self.riders)[1]
+            total = round(subtotal - discount + tax + (delivery_charge or 0), 3)
+            subtotal = round(subtotal, 3)
+
+            person = None
+            if payment == "credit" or catering or rng.random() < 0.08:
+                # Squaring skews visits toward the first, regular customers
+                person = self.people[int(len(self.people) * rng.random() ** 2)]
+            if catering:
+                payment = "deposit"
+                event = day + timedelta(days=rng.randrange(2, 30))
+                event_date = event.isoformat()
+                event_time = f"{rng.choice((12, 13, 18, 19, 20)):02d}:{rng.choice((0, 30)):02d}"
+                guests = rng.randrange(20, 250)
+                event_type = rng.choice(EVENT_TYPES)
+                deposit = round(total * rng.choice((0.25, 0.3, 0.5)), 3)
+
+            # Dining tables stay open a while, counter orders close quickly
+            service_minutes = rng.uniform(20, 75) if service.startswith("Dining") else rng.uniform(2, 15)
+            closed = moment + service_minutes * 60
+            status = "completed"
+            if catering and day_epoch(date.fromisoformat(event_date)) > self.end_epoch:
+                status = "pending"
+            elif last_day and closed > self.end_epoch - 3 * 3600:
+                status = "pending"
+            elif rng.random() < 0.025 and payment != "credit":
+                status = "cancelled"
+            updated_epoch = closed if status != "pending" else moment
+            cash = bank = None
+            if payment == "cash":
+                cash, bank = total, 0.0
+            elif payment == "bank":
+                cash, bank = 0.0, total
+            elif payment == "split":
+                cash = round(total * rng.choice((0.3, 0.4, 0.5, 0.6)), 3)
+                bank = round(total - cash, 3)
+            elif payment == "deposit":
+                cash, bank = (deposit, 0.0) if rng.random() < 0.5 else (0.0, deposit)
+            deleted = 0
+            if rng.random() < 0.001:
+                deleted, updated_epoch = 1, updated_epoch + rng.uniform(600, 7200)
+            # Tablets still offline at the end of the data have unsynced work
+            synced = int(device == DEVICES[0] or not last_day or rng.random() < 0.6)
+            orders.append((
+                order_id, self.staff_numbers[device], order_id, device, service, subtotal, tax, discount, total,
+                status, created, payment, person['id'] if person else None, cash, bank, synced,
+                stamp(updated_epoch + 2) if synced else None, 1, delivery_charge, address, rider, event_date,
+                event_time, guests, event_type, deposit, token_number, person['name'] if person else None,
+                stamp(updated_epoch), deleted, int(service.startswith("Dining") and rng.random() < 0.4)))
+
+            if person is not None:
+                person['visited'] = created
+                person['updated'] = created
+            if payment == "credit" and status == "completed" and not deleted:
+                self.credit_id += 1
+                # Most tabs are cleared within a few weeks; settling flips
+                # isCompleted and stamps updated_at, as the app does
+                settled = moment + rng.expovariate(1 / (12 * 86400))
+                paid = settled < self.end_epoch and rng.random() < 0.9
+                if paid:
+                    person['updated'] = max(person['updated'], stamp(settled))
+                else:
+                    person['credit'] = round(person['credit'] + total, 3)
+                credits.append((f"{int(moment * 1000)}{self.credit_id % 1000:03d}", person['id'], person['name'],
+                                str(order_id), total, created, service, int(paid),
+                                stamp(settled) if paid else created, 0))
+        return orders, items, credits
+
+def expense_day(rng, day, expense_id):
+    # A few vouchers a day, plus rent and salaries on the first of the month
+    vouchers = []
+    for _ in range(rng.choices((0, 1, 2, 3, 4), (10, 30, 30, 20, 10))[0]):
+        category = rng.choice(list(EXPENSE_ACCOUNTS))
+        lines = [(category, rng.choice(EXPENSE_ACCOUNTS[category]), round(rng.uniform(2, 60), 3))
+                 for _ in range(rng.randrange(1, 6))]
+        vouchers.append(lines)
+    if day.day == 1:
+        vouchers.append([("Rent", "Shop rent", 450.0)])
+        vouchers.append([("Salaries", f"Staff salary {i + 1}", round(rng.uniform(180, 420), 3)) for i in range(9)])
+    expenses, items = [], []
+    created = day_epoch(day) + 20 * 3600
+    for lines in vouchers:
+        expense_id += 1
+        created += rng.uniform(60, 3600)
+        expenses.append((expense_id, day.strftime("%d-%m-%Y"), rng.choice(("Cashier", "Salesman")),
+                         rng.choice(("Cash Account", "Cash Account", "Bank Account")),
+                         round(sum(amount for _, _, amount in lines), 3), stamp(created)))
+        for sl_no, (account, narration, amount) in enumerate(lines, 1):
+            items.append((expense_id, sl_no, account, narration, amount, ""))
+    return expenses, items, expense_id
+
+def generate(out_dir, seed, first_day, days, per_day, customers, riders, force=False):
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    conns = {name: open_database(out_dir, name, force) for name in DATABASES}
+    last_day = first_day + timedelta(days=days - 1)
+    end_epoch = day_epoch(last_day + timedelta(days=1))
+    opened = stamp(day_epoch(first_day))
+    menu, menu_rows, menu_weights = build_menu(rng, opened)
+    people = build_people(rng, customers, first_day)
+    rider_rows = build_riders(rng, riders, opened)
+    day_builder = OrderDay(rng, menu, menu_weights, people, rider_rows, end_epoch)
+    counts = dict.fromkeys(("orders", "order_items", "credit_transactions", "expenses", "expense_items"), 0)
+    order_sql = insert_sql("orders", ORDER_COLUMNS)
+    item_sql = insert_sql("order_items", ITEM_COLUMNS)
+    credit_sql = insert_sql("credit_transactions", ("id", "customerId", "customerName", "orderNumber", "amount",
+                                                   "createdAt", "serviceType", "isCompleted", "updated_at",
+                                                   "is_deleted"))
+    expense_sql = insert_sql("expenses", ("id", "date", "cashier", "accountType", "grandTotal", "createdAt"))
+    expense_item_sql = insert_sql("expense_items", ("expense_id", "slNo", "account", "narration", "amount",
+                                                    "remarks"))
+    expense_id = 0
+    for n in range(days):
+        day = first_day + timedelta(days=n)
+        # Slow start, a busy middle and the odd quiet or rush day
+        trend = 0.85 + 0.3 * min(1.0, n / 120)
+        count = max(1, int(per_day * WEEKDAY_FACTOR[day.weekday()] * trend * rng.uniform(0.85, 1.15)))
+        orders, items, credits = day_builder.generate(day, count, day == last_day)
+        conns[ORDERS_DB].executemany(order_sql, orders)
+        conns[ORDERS_DB].executemany(item_sql, items)
+        conns[CREDIT_DB].executemany(credit_sql, credits)
+        expenses, expense_items, expense_id = expense_day(rng, day, expense_id)
+        conns[EXPENSES_DB].executemany(expense_sql, expenses)
+        conns[EXPENSES_DB].executemany(expense_item_sql, expense_items)
+        for table, rows in (("orders", orders), ("order_items", items), ("credit_transactions", credits),
+                            ("expenses", expenses), ("expense_items", expense_items)):
+            counts[table] += len(rows)
+        if day.day == 1 or day == last_day:
+            print(f"  {day.isoformat()}: {counts['orders']} orders", file=sys.stderr)
+
+    conns[MENU_DB].executemany(insert_sql("menu_items", ("id", "name", "price", "imageUrl", "category",
+                                                         "isAvailable", "isDeleted", "lastUpdated", "taxExempt",
+                                                         "isPerPlate", "purchasePrice", "barcode", "sizes")),
+                               menu_rows)
+    conns[PERSONS_DB].executemany(
+        insert_sql("persons", ("id", "name", "phoneNumber", "place", "dateVisited", "credit", "updated_at",
+                               "is_deleted")),
+        [(p['id'], p['name'], p['phone'], p['place'], p['visited'] or opened, p['credit'], p['updated'] or opened, 0)
+         for p in people])
+    conns[DELIVERY_BOYS_DB].executemany(insert_sql("delivery_boys", ("id", "name", "phoneNumber", "updated_at",
+                                                                     "is_deleted")), rider_rows)
+    counts.update(menu_items=len(menu_rows), persons=len(people), delivery_boys=len(rider_rows))
+    # Indexes are built once over the loaded tables, then every file is
+    # switched to the WAL mode the app opens it in
+    for sql in ORDER_INDEXES:
+        conns[ORDERS_DB].execute(sql)
+    for conn in conns.values():
+        conn.commit()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic year of cafe data in the "
+                                                 "app's six SQLite databases.")
+    parser.add_argument("-o", "--out-dir", default="synthetic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", help="first business day, YYYY-MM-DD (default: a year before today)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--orders-per-day", type=int, default=1500, help="average for a weekday")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--riders", type=int, default=8)
+    parser.add_argument("--force", action="store_true", help="replace databases already in the output folder")
+    args = parser.parse_args(argv)
+
+    first_day = date.fromisoformat(args.start) if args.start else date.today() - timedelta(days=args.days)
+    started = time.perf_counter()
+    counts = generate(args.out_dir, args.seed, first_day, args.days, args.orders_per_day, args.customers,
+                      args.riders, args.force)
+    for table, count in counts.items():
+        print(f"  {table:<20} {count:>10}")
+    # The same seed and start day rebuild the same rows
+    print(f"Successfully generated {sum(counts.values())} rows from {first_day.isoformat()} "
+          f"(--seed {args.seed} --start {first_day.isoformat()}) in {args.out_dir} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
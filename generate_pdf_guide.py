@@ -8,7 +8,16 @@ from reportlab.platypus import (
 )
 from reportlab.pdfgen import canvas
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cafeapp"))
+from profiling import profiled, mark
+
 class NumberedCanvas(canvas.Canvas):
+    header_title = "SIMS CAFE — COMPLETE ARCHITECTURE, TECHNOLOGIES & TEACHING MANUAL"
+    header_subtitle = "System Master Reference Guide"
+    footer_text = "SIMS CAFE Management System | POS, ERP & LAN Sync Infrastructure"
+    # Pages before this number (the cover) are left without header and footer
+    first_decorated_page = 2
+
     def __init__(self, *args, **kwargs):
         super(NumberedCanvas, self).__init__(*args, **kwargs)
         self._saved_page_states = []
@@ -25,52 +34,53 @@ class NumberedCanvas(canvas.Canvas):
             super(NumberedCanvas, self).showPage()
         super(NumberedCanvas, self).save()
 
-    def draw_header_footer(self, page_count):
+    def draw_header_footer(self, page_count=None):
+        # page_count is None when pages are emitted before the total is known
         self.saveState()
-        if self._pageNumber > 1:
+        if self._pageNumber >= self.first_decorated_page:
+            page_width, page_height = self._pagesize
             # Header
             self.setFont("Helvetica-Bold", 8)
             self.setFillColor(colors.HexColor("#334155"))
-            self.drawString(54, 11 * 72 - 36, "SIMS CAFE — COMPLETE ARCHITECTURE, TECHNOLOGIES & TEACHING MANUAL")
+            self.drawString(54, page_height - 36, self.header_title)
             self.setFont("Helvetica", 8)
-            self.drawRightString(8.5 * 72 - 54, 11 * 72 - 36, "System Master Reference Guide")
+            self.drawRightString(page_width - 54, page_height - 36, self.header_subtitle)
             self.setStrokeColor(colors.HexColor("#CBD5E1"))
             self.setLineWidth(0.75)
-            self.line(54, 11 * 72 - 42, 8.5 * 72 - 54, 11 * 72 - 42)
+            self.line(54, page_height - 42, page_width - 54, page_height - 42)
 
             # Footer
             self.setStrokeColor(colors.HexColor("#E2E8F0"))
             self.setLineWidth(0.75)
-            self.line(54, 46, 8.5 * 72 - 54, 46)
+            self.line(54, 46, page_width - 54, 46)
             self.setFont("Helvetica", 8)
             self.setFillColor(colors.HexColor("#64748B"))
-            self.drawString(54, 32, "SIMS CAFE Management System | POS, ERP & LAN Sync Infrastructure")
-            self.drawRightString(8.5 * 72 - 54, 32, f"Page {self._pageNumber} of {page_count}")
+            self.drawString(54, 32, self.footer_text)
+            if page_count is None:
+                self.drawRightString(page_width - 54, 32, f"Page {self._pageNumber}")
+            else:
+                self.drawRightString(page_width - 54, 32, f"Page {self._pageNumber} of {page_count}")
         self.restoreState()
 
-def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf"):
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=letter,
-        leftMargin=54,
-        rightMargin=54,
-        topMargin=54,
-        bottomMargin=54
-    )
-
+def part_name(filename, part):
+    # Output split into parts: NAME_001.pdf, NAME_002.pdf, ...
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{part:03d}{ext or '.pdf'}"
+
+# Cohesive Color Palette
+C_PRIMARY = colors.HexColor("#0F172A")    # Deep Slate Navy
+C_SECONDARY = colors.HexColor("#0284C7")  # Sky Blue Accent
+C_TEAL = colors.HexColor("#0D9488")       # Deep Teal
+C_DARK = colors.HexColor("#1E293B")       # Dark Charcoal
+C_MUTED = colors.HexColor("#64748B")      # Muted Slate
+C_BG_LIGHT = colors.HexColor("#F8FAFC")   # Light Row Background
+C_BORDER = colors.HexColor("#CBD5E1")     # Clean Grid Border
+C_CALLOUT_BG = colors.HexColor("#F1F5F9") # Callout Background
+C_INDIGO = colors.HexColor("#4F46E5")
+
+def build_styles():
     styles = getSampleStyleSheet()
 
-    # Cohesive Color Palette
-    c_primary = colors.HexColor("#0F172A")    # Deep Slate Navy
-    c_secondary = colors.HexColor("#0284C7")  # Sky Blue Accent
-    c_teal = colors.HexColor("#0D9488")       # Deep Teal
-    c_dark = colors.HexColor("#1E293B")       # Dark Charcoal
-    c_muted = colors.HexColor("#64748B")      # Muted Slate
-    c_bg_light = colors.HexColor("#F8FAFC")   # Light Row Background
-    c_border = colors.HexColor("#CBD5E1")     # Clean Grid Border
-    c_callout_bg = colors.HexColor("#F1F5F9") # Callout Background
-    c_indigo = colors.HexColor("#4F46E5")
-
     # Typography Styles
     h1_style = ParagraphStyle(
         'H1',
@@ -78,7 +88,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica-Bold',
         fontSize=14,
         leading=18,
-        textColor=c_primary,
+        textColor=C_PRIMARY,
         spaceBefore=14,
         spaceAfter=5,
         keepWithNext=True
@@ -90,7 +100,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica-Bold',
         fontSize=10.5,
         leading=14,
-        textColor=c_teal,
+        textColor=C_TEAL,
         spaceBefore=10,
         spaceAfter=4,
         keepWithNext=True
@@ -102,7 +112,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica-Bold',
         fontSize=9,
         leading=12,
-        textColor=c_dark,
+        textColor=C_DARK,
         spaceBefore=6,
         spaceAfter=3,
         keepWithNext=True
@@ -114,7 +124,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica',
         fontSize=8,
         leading=11.5,
-        textColor=c_dark,
+        textColor=C_DARK,
         spaceAfter=4
     )
 
@@ -124,7 +134,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica',
         fontSize=8,
         leading=11.5,
-        textColor=c_dark,
+        textColor=C_DARK,
         leftIndent=12,
         firstLineIndent=-8,
         spaceAfter=3
@@ -163,7 +173,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica',
         fontSize=7,
         leading=9.5,
-        textColor=c_dark
+        textColor=C_DARK
     )
 
     table_cell_bold = ParagraphStyle(
@@ -172,9 +182,46 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         fontName='Helvetica-Bold',
         fontSize=7,
         leading=9.5,
-        textColor=c_dark
+        textColor=C_DARK
     )
 
+    return {
+        'h1': h1_style,
+        'h2': h2_style,
+        'h3': h3_style,
+        'body': body_style,
+        'bullet': bullet_style,
+        'code': code_style,
+        'callout': callout_style,
+        'table_header': table_header_style,
+        'table_cell': table_cell_style,
+        'table_cell_bold': table_cell_bold,
+    }
+
+@profiled("build_pdf")
+def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf"):
+    doc = SimpleDocTemplate(
+        filename,
+        pagesize=letter,
+        leftMargin=54,
+        rightMargin=54,
+        topMargin=54,
+        bottomMargin=54
+    )
+
+    styles = build_styles()
+    h1_style = styles['h1']
+    h2_style = styles['h2']
+    h3_style = styles['h3']
+    body_style = styles['body']
+    bullet_style = styles['bullet']
+    code_style = styles['code']
+    callout_style = styles['callout']
+    table_header_style = styles['table_header']
+    table_cell_style = styles['table_cell']
+    table_cell_bold = styles['table_cell_bold']
+    mark("styles")
+
     story = []
 
     # ══════════════════════════════════════════════════════════════════════════
@@ -205,7 +252,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 1. EXECUTIVE SUMMARY & ARCHITECTURAL HIGHLIGHTS
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("1. Executive Summary & Project Purpose", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
     
     exec_summary_text = (
         "<b>SIMS Cafe</b> is a production-grade, enterprise Point-of-Sale (POS) and Restaurant Management ERP ecosystem. "
@@ -221,7 +268,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 2. TECHNOLOGIES & LIBRARIES CATALOG
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("2. Complete Technology Stack & Detailed Library Catalog", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph(
         "Below is the complete, categorized breakdown of all programming languages, frameworks, Flutter packages, and .NET libraries used in SIMS Cafe along with their exact functional role:",
@@ -272,8 +319,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     lib_table_1.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0F172A")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(lib_table_1)
@@ -323,8 +370,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     lib_table_2.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0D9488")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(lib_table_2)
@@ -377,8 +424,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     lib_table_3.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0284C7")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(lib_table_3)
@@ -433,8 +480,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     lib_table_4.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(lib_table_4)
@@ -447,7 +494,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 3. FUNCTIONS & FEATURES SPECIFICATION
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("3. Functions & Features Catalog", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph(
         "SIMS Cafe incorporates a full suite of restaurant and retail automation capabilities organized into functional modules:",
@@ -520,8 +567,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     features_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0D9488")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(features_table)
@@ -534,7 +581,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 4. SYSTEM REQUIREMENTS & INSTALLATION PREREQUISITES
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("4. System & Installation Requirements", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph(
         "To deploy, run, or build SIMS Cafe, the following hardware, operating system, and software specifications are required:",
@@ -579,8 +626,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     hw_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1E293B")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(hw_table)
@@ -606,8 +653,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     dev_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0284C7")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(dev_table)
@@ -633,7 +680,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 5. DATABASE ARCHITECTURE & SQLITE SCHEMAS
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("5. Local Database Architecture & SQLite Schemas", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
     
     schema_intro = (
         "The system isolates its storage into <b>six dedicated SQLite databases</b> located in the persistent OS application directory. "
@@ -666,8 +713,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     orders_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1E293B")),
         ('PADDING', (0, 0), (-1, -1), 2.5),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
     ]))
     story.append(orders_table)
@@ -687,8 +734,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     items_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0D9488")),
         ('PADDING', (0, 0), (-1, -1), 2.5),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
     ]))
     story.append(items_table)
@@ -727,8 +774,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     other_dbs_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#475569")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(other_dbs_table)
@@ -741,7 +788,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 6. NETWORKING, REST APIS & HARDWARE PRINTING
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("6. Networking, APIs & Hardware Integration", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph("A. Embedded Host REST API Endpoints (Shelf Server :8642)", h2_style))
     endpoints_data = [
@@ -776,8 +823,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     endpoints_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0F172A")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(endpoints_table)
@@ -811,8 +858,8 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     printer_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1E293B")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, c_bg_light]),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(printer_table)
@@ -822,7 +869,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 7. BUILD, PACKAGING & COMPILATION COMMANDS
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("7. Build & Compilation Guide (Windows EXE & Android APK)", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph("A. Automated Windows Build Workflow", h2_style))
     story.append(Paragraph(
@@ -857,7 +904,7 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     # 8. TEACHING, PRESENTATION & VIVA GUIDE
     # ══════════════════════════════════════════════════════════════════════════
     story.append(Paragraph("8. Presentation & Teaching Manual (Demo Script & Viva Q&A)", h1_style))
-    story.append(HRFlowable(width="100%", thickness=1, color=c_secondary, spaceBefore=2, spaceAfter=5))
+    story.append(HRFlowable(width="100%", thickness=1, color=C_SECONDARY, spaceBefore=2, spaceAfter=5))
 
     story.append(Paragraph("A. 2-Minute Elevator Pitch", h2_style))
     pitch_box = [
@@ -874,9 +921,9 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
     ]
     pitch_table = Table(pitch_box, colWidths=[504])
     pitch_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), c_callout_bg),
+        ('BACKGROUND', (0, 0), (-1, -1), C_CALLOUT_BG),
         ('PADDING', (0, 0), (-1, -1), 7),
-        ('BOX', (0, 0), (-1, -1), 1, c_teal),
+        ('BOX', (0, 0), (-1, -1), 1, C_TEAL),
     ]))
     story.append(pitch_table)
     story.append(Spacer(1, 6))
@@ -928,14 +975,17 @@ def build_pdf(filename="SIMS_Cafe_Master_Architecture_and_Presentation_Guide.pdf
         ('BACKGROUND', (0, 4), (-1, 4), colors.HexColor("#F1F5F9")),
         ('BACKGROUND', (0, 6), (-1, 6), colors.HexColor("#F1F5F9")),
         ('PADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, c_border),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
     story.append(viva_table)
     story.append(Spacer(1, 8))
 
+    mark("story")
+
     # Build Document
     doc.build(story, canvasmaker=NumberedCanvas)
+    mark("layout")
     print(f"Successfully generated {filename}")
 
 if __name__ == '__main__':
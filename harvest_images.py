@@ -0,0 +1,473 @@
+import io
+import os
+import sys
+import ssl
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cafeapp"))
+from image_pipeline import build_stages, run_pipeline
+from cafe_schema import MENU_DB
+
+USER_AGENT = "SIMS-Cafe-Harvester/1.0"
+
+STORE_INDEX = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha1 TEXT,
+    status INTEGER,
+    checked_at TEXT
+)
+"""
+
+class HttpError(Exception):
+    pass
+
+async def read_response(reader, timeout=30.0):
+    # Every read gets its own deadline, so a server that stops sending
+    # mid-body fails this URL instead of hanging the run
+    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise HttpError(f"malformed status line {lines[0][:80]!r}")
+    status = int(parts[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    if status in (204, 304) or 100 <= status < 200:
+        body = b""
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        parts = []
+        while True:
+            size = int((await asyncio.wait_for(reader.readuntil(b"\r\n"), timeout)).split(b";")[0], 16)
+            if size == 0:
+                # Skip any trailer fields up to the blank line
+                while await asyncio.wait_for(reader.readuntil(b"\r\n"), timeout) != b"\r\n":
+                    pass
+                break
+            parts.append(await asyncio.wait_for(reader.readexactly(size), timeout))
+            await asyncio.wait_for(reader.readexactly(2), timeout)
+        body = b"".join(parts)
+    elif "content-length" in headers:
+        body = await asyncio.wait_for(reader.readexactly(int(headers["content-length"])), timeout)
+    else:
+        body = await asyncio.wait_for(reader.read(), timeout)
+        headers["connection"] = "close"
+    return status, headers, body
+
+class ConnectionPool:
+    # Idle keep-alive connections per origin. The per-host semaphore caps
+    # open sockets so a slow CDN cannot soak up every slot.
+    def __init__(self, per_host=6, timeout=30.0):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.idle = {}
+        self.slots = {}
+        self.opened = 0
+        self.requests = 0
+
+    async def request(self, url, headers):
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if secure else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        slots = self.slots.setdefault(origin, asyncio.Semaphore(self.per_host))
+        async with slots:
+            idle = self.idle.setdefault(origin, [])
+            # A pooled socket may have been closed by the server while idle;
+            # retry once on a fresh connection before giving up.
+            for attempt in range(2):
+                fresh = not idle
+                if fresh:
+                    try:
+                        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                            origin[1], origin[2], ssl=ssl.create_default_context() if secure else None), self.timeout)
+                    except asyncio.TimeoutError:
+                        raise HttpError(f"no connection within {self.timeout:g}s") from None
+                    self.opened += 1
+                else:
+                    reader, writer = idle.pop()
+                lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", f"User-Agent: {USER_AGENT}",
+                         "Accept: image/*", "Connection: keep-alive"]
+                lines += [f"{k}: {v}" for k, v in headers.items()]
+                try:
+                    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                    status, reply, body = await read_response(reader, self.timeout)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    writer.close()
+                    if fresh or attempt:
+                        raise
+                    continue
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise HttpError(f"no response within {self.timeout:g}s") from None
+                except BaseException:
+                    # Malformed or cancelled: the socket's state is unknown
+                    writer.close()
+                    raise
+                self.requests += 1
+                if reply.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    idle.append((reader, writer))
+                return status, reply, body
+
+    async def close(self):
+        writers = [writer for connections in self.idle.values() for _, writer in connections]
+        self.idle.clear()
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers), return_exceptions=True)
+
+class ContentStore:
+    # raw/ holds downloads by content hash, keyed/ the processed PNG for the
+    # same hash, so two products sharing a photo are fetched once per URL
+    # but keyed only once.
+    def __init__(self, root):
+        self.root = root
+        for sub in ("raw", "keyed"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(STORE_INDEX)
+
+    def raw_path(self, sha1):
+        return os.path.join(self.root, "raw", sha1)
+
+    def keyed_path(self, sha1):
+        return os.path.join(self.root, "keyed", sha1 + ".png")
+
+    def lookup(self, url):
+        return self.conn.execute("SELECT etag, last_modified, sha1 FROM images WHERE url = ?", (url,)).fetchone()
+
+    def put_raw(self, data):
+        sha1 = hashlib.sha1(data).hexdigest()
+        path = self.raw_path(sha1)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return sha1
+
+    def record(self, url, etag, last_modified, sha1, status):
+        self.conn.execute(
+            "INSERT INTO images (url, etag, last_modified, sha1, status, checked_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+            "sha1 = excluded.sha1, status = excluded.status, checked_at = excluded.checked_at",
+            (url, etag, last_modified, sha1, status, datetime.now(timezone.utc).isoformat()))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+def key_image(raw_path, out_path, max_size=512):
+    # Runs in the worker pool; paths rather than bytes cross the process
+    # boundary so the parent never holds more than the in-flight downloads.
+    try:
+        with open(raw_path, "rb") as f:
+            data, trace = run_pipeline(f.read(), build_stages("menu", resize={'max_size': max_size}))
+        with open(out_path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(out_path + ".tmp", out_path)
+        return sum(r['ms'] for r in trace), None
+    except Exception as e:
+        return 0.0, f"{os.path.basename(raw_path)}: {e}"
+
+class HarvestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.fetched = 0
+        self.not_modified = 0
+        self.keyed = 0
+        self.key_ms = 0.0
+        self.shared = 0
+        self.bytes_in = 0
+        self.errors = []
+
+    def line(self, pool):
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.fetched} fetched, {self.not_modified} not modified, {self.keyed} keyed "
+                f"({self.shared} reused), {len(self.errors)} errors, {self.bytes_in / 1e6:.1f} MB "
+                f"over {pool.opened} connections / {pool.requests} requests in {elapsed:.1f}s")
+
+class Harvester:
+    def __init__(self, store, pool, executor, stats, concurrency=16, workers=1, max_size=512, max_redirects=5):
+        self.store = store
+        self.pool = pool
+        self.executor = executor
+        self.stats = stats
+        self.fetch_slots = asyncio.Semaphore(concurrency)
+        # Downloads wait here while the worker pool is busy, which bounds
+        # the number of images sitting in memory or on the executor queue.
+        self.key_slots = asyncio.Semaphore(workers * 2)
+        self.max_size = max_size
+        self.max_redirects = max_redirects
+        self.keying = set()
+
+    async def _get(self, url, headers):
+        for _ in range(self.max_redirects + 1):
+            status, reply, body = await self.pool.request(url, headers)
+            if status in (301, 302, 303, 307, 308) and "location" in reply:
+                url = urljoin(url, reply["location"])
+                headers = {}
+                continue
+            return status, reply, body
+        raise HttpError("too many redirects")
+
+    async def _key(self, sha1):
+        out = self.store.keyed_path(sha1)
+        if sha1 in self.keying or os.path.exists(out):
+            self.stats.shared += 1
+            return
+        self.keying.add(sha1)
+        try:
+            async with self.key_slots:
+                loop = asyncio.get_running_loop()
+                ms, error = await loop.run_in_executor(self.executor, key_image, self.store.raw_path(sha1), out,
+                                                       self.max_size)
+        finally:
+            self.keying.discard(sha1)
+        if error:
+            self.stats.errors.append(error)
+        else:
+            self.stats.keyed += 1
+            self.stats.key_ms += ms
+
+    async def harvest(self, url):
+        async with self.fetch_slots:
+            known = self.store.lookup(url)
+            headers = {}
+            if known and known[2] and os.path.exists(self.store.raw_path(known[2])):
+                if known[0]:
+                    headers["If-None-Match"] = known[0]
+                if known[1]:
+                    headers["If-Modified-Since"] = known[1]
+            try:
+                status, reply, body = await self._get(url, headers)
+            except (OSError, asyncio.IncompleteReadError, HttpError, ValueError) as e:
+                self.stats.errors.append(f"{url}: {e}")
+                return
+            self.stats.bytes_in += len(body)
+            if status == 304 and not headers:
+                # Only a conditional request may be answered with 304
+                self.stats.errors.append(f"{url}: HTTP 304 without a cached copy")
+                return
+            if status == 304:
+                self.stats.not_modified += 1
+                sha1 = known[2]
+                self.store.record(url, reply.get("etag", known[0]), reply.get("last-modified", known[1]), sha1, 304)
+            elif status == 200:
+                self.stats.fetched += 1
+                sha1 = self.store.put_raw(body)
+                self.store.record(url, reply.get("etag"), reply.get("last-modified"), sha1, 200)
+            else:
+                self.stats.errors.append(f"{url}: HTTP {status}")
+                return
+        # Outside the fetch slot so keying never holds up downloads
+        await self._key(sha1)
+
+async def harvest_urls(urls, store_dir, concurrency=16, per_host=6, workers=None, max_size=512, timeout=30.0):
+    store = ContentStore(store_dir)
+    pool = ConnectionPool(per_host, timeout)
+    stats = HarvestStats()
+    workers = workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            harvester = Harvester(store, pool, executor, stats, concurrency, workers, max_size)
+            tasks = [asyncio.create_task(harvester.harvest(url)) for url in dict.fromkeys(urls)]
+            try:
+                for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                    await task
+                    if done % 500 == 0:
+                        store.conn.commit()
+                        print(stats.line(pool), file=sys.stderr)
+            finally:
+                # On an unexpected error, stop the remaining downloads
+                # before the executor and the index are closed under them
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # Whatever was recorded so far is committed either way
+        await pool.close()
+        store.close()
+    return stats, pool
+
+def menu_image_urls(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT imageUrl FROM menu_items WHERE isDeleted = 0 "
+                            "AND (imageUrl LIKE 'http://%' OR imageUrl LIKE 'https://%')")
+        return [url for (url,) in rows]
+    finally:
+        conn.close()
+
+def make_fixture(index, size=640):
+    from PIL import Image, ImageDraw
+    rng = random.Random(index)
+    img = Image.new("RGB", (size, size * 3 // 4), "white")
+    draw = ImageDraw.Draw(img)
+    for _ in range(8):
+        x, y = rng.randint(40, size // 2), rng.randint(40, size // 3)
+        draw.ellipse([x, y, x + rng.randint(80, size // 2), y + rng.randint(60, size // 3)],
+                     fill=(rng.randint(0, 200), rng.randint(0, 200), rng.randint(0, 200)))
+    out = io.BytesIO()
+    img.save(out, "JPEG" if index % 2 else "PNG")
+    return out.getvalue()
+
+class FixtureHost:
+    # Stand-in image server: keep-alive, strong ETags and Last-Modified with
+    # 304 handling, optional per-request latency like a distant CDN.
+    def __init__(self, images=200, fixtures_dir=None, latency=0.0, duplicates=0.1):
+        self.latency = latency
+        self.files = {}
+        stamp = formatdate(time.time() - 86400, usegmt=True)
+        if fixtures_dir:
+            for name in sorted(os.listdir(fixtures_dir)):
+                with open(os.path.join(fixtures_dir, name), "rb") as f:
+                    self._add("/" + name, f.read(), stamp)
+        else:
+            rng = random.Random(images)
+            for i in range(images):
+                # Some products reuse another product's photo under a new URL
+                source = rng.randrange(i) if i and rng.random() < duplicates else i
+                self._add(f"/menu/{i}.{'jpg' if source % 2 else 'png'}", make_fixture(source), stamp)
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+
+    def _add(self, path, data, stamp):
+        self.files[path] = (data, '"' + hashlib.sha1(data).hexdigest()[:16] + '"', stamp)
+
+    def urls(self, base):
+        return [base + path for path in self.files]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                path = lines[0].split(" ")[1]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                entry = self.files.get(path)
+                if entry is None:
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                    continue
+                data, etag, stamp = entry
+                fresh = headers.get("if-none-match") == etag
+                if not fresh and "if-none-match" not in headers and "if-modified-since" in headers:
+                    try:
+                        fresh = parsedate_to_datetime(headers["if-modified-since"]) >= parsedate_to_datetime(stamp)
+                    except (TypeError, ValueError):
+                        fresh = False
+                common = f"ETag: {etag}\r\nLast-Modified: {stamp}\r\nCache-Control: max-age=0\r\n"
+                if fresh:
+                    self.not_modified += 1
+                    writer.write(f"HTTP/1.1 304 Not Modified\r\n{common}\r\n".encode())
+                else:
+                    kind = "image/jpeg" if path.endswith(".jpg") else "image/png"
+                    writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {kind}\r\nContent-Length: {len(data)}\r\n"
+                                 f"{common}\r\n".encode() + data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def report(self):
+        return f"stand-in served {self.requests} requests ({self.not_modified} x 304) on {self.connections} connections"
+
+async def serve(args):
+    host = FixtureHost(args.images, args.fixtures, args.latency)
+    server = await asyncio.start_server(host.handle, args.host, args.port, backlog=1024)
+    base = f"http://{args.host}:{args.port}"
+    if args.write_urls:
+        with open(args.write_urls, "w", encoding="utf-8") as f:
+            f.write("\n".join(host.urls(base)) + "\n")
+    print(f"Image stand-in serving {len(host.files)} images on {base}")
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            print(host.report())
+
+async def harvest(args):
+    urls = []
+    if args.db:
+        urls += menu_image_urls(args.db)
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip()]
+    server = stand_in = None
+    if not args.db and not args.urls:
+        stand_in = FixtureHost(args.images, latency=args.latency)
+        server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0, backlog=1024)
+        host, port = server.sockets[0].getsockname()[:2]
+        urls = stand_in.urls(f"http://{host}:{port}")
+    for round_no in range(1, args.rounds + 1):
+        stats, pool = await harvest_urls(urls, args.store, args.concurrency, args.per_host, args.workers, args.max_size,
+                                         args.timeout)
+        for message in stats.errors[:20]:
+            print(f"  {message}")
+        print(f"Round {round_no}: {stats.line(pool)}")
+    if server is not None:
+        server.close()
+        print(stand_in.report())
+    print(f"Successfully harvested {len(set(urls))} image URLs into {args.store}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch, revalidate and key menu imageUrl images into a local content store.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve", help="run only the stand-in image server")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8700)
+    p_serve.add_argument("--images", type=int, default=200, help="generated fixture images")
+    p_serve.add_argument("--fixtures", help="serve the files in this folder instead")
+    p_serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    p_serve.add_argument("--write-urls", help="write the served URLs here, one per line")
+
+    p_run = sub.add_parser("harvest", help="harvest images (from an in-process stand-in unless --db or --urls is given)")
+    p_run.add_argument("--db", help=f"read imageUrl from menu_items, e.g. {MENU_DB}")
+    p_run.add_argument("--urls", help="file with one image URL per line")
+    p_run.add_argument("--store", default="image_store")
+    p_run.add_argument("--concurrency", type=int, default=16, help="downloads in flight")
+    p_run.add_argument("--per-host", type=int, default=6, help="connections per host")
+    p_run.add_argument("--workers", type=int, default=None, help="keying processes")
+    p_run.add_argument("--max-size", type=int, default=512)
+    p_run.add_argument("--timeout", type=float, default=30.0, help="seconds to connect and for each read")
+    p_run.add_argument("--rounds", type=int, default=1, help="repeat to exercise revalidation")
+    p_run.add_argument("--images", type=int, default=200, help="images on the in-process stand-in")
+    p_run.add_argument("--latency", type=float, default=0.02, help="latency of the in-process stand-in")
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args) if args.mode == "serve" else harvest(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
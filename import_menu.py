@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import base64
+import hashlib
+import sqlite3
+import argparse
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cafeapp"))
+from image_pipeline import build_stages, run_pipeline
+from cafe_schema import MENU_DB, SCHEMA_VERSIONS, create_schema, schema_version, tune_for_bulk_load
+
+UPSERT_SQL = """
+INSERT INTO menu_items (id, name, price, imageUrl, category, isAvailable, isDeleted, lastUpdated,
+                        purchasePrice, barcode, sizes)
+VALUES (:id, :name, :price, :imageUrl, :category, :isAvailable, 0, :lastUpdated,
+        :purchasePrice, :barcode, :sizes)
+ON CONFLICT(id) DO UPDATE SET
+    name = excluded.name,
+    price = excluded.price,
+    imageUrl = COALESCE(NULLIF(excluded.imageUrl, ''), menu_items.imageUrl),
+    category = excluded.category,
+    isAvailable = excluded.isAvailable,
+    isDeleted = 0,
+    lastUpdated = excluded.lastUpdated,
+    purchasePrice = excluded.purchasePrice,
+    barcode = excluded.barcode,
+    sizes = excluded.sizes
+"""
+
+def iter_sheet_rows(path):
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            sys.exit("Reading .xlsx needs openpyxl (pip install openpyxl), or export the sheet to CSV")
+        # read_only streams rows from the zip instead of loading the sheet
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield ["" if v is None else str(v) for v in row]
+        finally:
+            wb.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+def _number(text):
+    cleaned = re.sub(r"[^\d.]", "", text or "")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+def iter_menu_rows(path, default_category="", images_dir=None):
+    # Column handling follows ExcelImportService._parseExcelSheetWithImages
+    # so sheets exported from the app import unchanged.
+    rows = iter_sheet_rows(path)
+    header = [h.strip().lower() for h in next(rows, [])]
+    cols = {h: i for i, h in enumerate(header) if h}
+    name_col = cols.get("name", 0)
+    price_col = cols.get("price", 1)
+    cost_col = cols.get("cost", -1)
+    category_col = cols.get("category", 2)
+    available_col = cols.get("available", 3)
+    barcode_col = cols.get("barcode", -1)
+    image_col = cols.get("image file", 4)
+    size_groups = sorted(int(h.split(" ")[1]) for h in cols if re.fullmatch(r"size \d+", h))
+    size_cols = [(cols[f"size {n}"], cols.get(f"price {n}", -1), cols.get(f"cost {n}", -1)) for n in size_groups]
+    if images_dir is None:
+        images_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "images")
+
+    def cell(row, i):
+        return row[i].strip() if 0 <= i < len(row) and row[i] is not None else ""
+
+    for line, row in enumerate(rows, start=2):
+        if not any(c.strip() for c in row):
+            continue
+        name = cell(row, name_col)
+        price = _number(cell(row, price_col))
+        if not name or price is None:
+            yield {'skipped': f"row {line}: missing name or price"}
+            continue
+        category = cell(row, category_col) or default_category
+        if not category:
+            yield {'skipped': f"row {line}: no category"}
+            continue
+        available = cell(row, available_col).lower()
+        sizes = []
+        for s_col, p_col, c_col in size_cols:
+            size_name = cell(row, s_col)
+            if size_name:
+                sizes.append({'name': size_name,
+                              'price': _number(cell(row, p_col)) or 0.0,
+                              'purchasePrice': _number(cell(row, c_col)) or 0.0})
+        image = cell(row, image_col).replace("images/", "").replace("images\\", "")
+        yield {
+            # Stable id so re-importing a sheet updates items instead of
+            # duplicating them (the app uses import_<millis>_<row>).
+            'id': "import_" + hashlib.sha1(f"{category}\x1f{name}".encode()).hexdigest()[:16],
+            'name': name,
+            'price': price,
+            'purchasePrice': _number(cell(row, cost_col)) or 0.0,
+            'category': category,
+            'isAvailable': 1 if not available or available in ("yes", "true", "1", "available") else 0,
+            'barcode': cell(row, barcode_col),
+            'sizes': json.dumps(sizes),
+            'imagePath': os.path.join(images_dir, image) if image else "",
+        }
+
+def process_image(path, max_size=512):
+    try:
+        with open(path, "rb") as f:
+            data, _ = run_pipeline(f.read(), build_stages("menu", resize={'max_size': max_size}))
+        return "data:image/png;base64," + base64.b64encode(data).decode("ascii"), None
+    except Exception as e:
+        return "", f"{os.path.basename(path)}: {e}"
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.items = 0
+        self.images = 0
+        self.image_errors = []
+        self.skipped = []
+
+    def line(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.items} items, {self.images} images, {len(self.skipped)} skipped rows "
+                f"in {elapsed:.1f}s ({self.items / elapsed:.0f} items/s, {self.images / elapsed:.1f} images/s)")
+
+def _write_batch(conn, batch, futures, stats):
+    images = {path: future.result() for path, future in futures.items()}
+    stamp = datetime.now().isoformat()
+    for item in batch:
+        url, error = images.get(item['imagePath'], ("", None))
+        item['imageUrl'] = url
+        item['lastUpdated'] = stamp
+        if url:
+            stats.images += 1
+        elif error:
+            stats.image_errors.append(error)
+    with conn:
+        conn.executemany(UPSERT_SQL, batch)
+    stats.items += len(batch)
+    print(stats.line(), file=sys.stderr)
+
+def import_menu(sheet, db_path=MENU_DB, category="", images_dir=None, batch_size=1000,
+                workers=None, max_size=512, skip_images=False):
+    conn = sqlite3.connect(db_path)
+    version = schema_version(conn)
+    if 0 < version < SCHEMA_VERSIONS[MENU_DB]:
+        # Older app schema: columns the upsert writes may not exist yet
+        conn.close()
+        sys.exit(f"{db_path} is at schema version {version}; open it in the app once to upgrade it "
+                 f"to {SCHEMA_VERSIONS[MENU_DB]} before importing")
+    tune_for_bulk_load(conn)
+    create_schema(conn, MENU_DB)
+    stats = ImportStats()
+    rows = iter_menu_rows(sheet, category, images_dir)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Images for batch N+1 are keyed in the pool while batch N is being
+        # written, so memory holds at most two batches of rows and images.
+        pending = None
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk and pending is None:
+                break
+            batch = [row for row in chunk if 'skipped' not in row]
+            stats.skipped.extend(row['skipped'] for row in chunk if 'skipped' in row)
+            futures = {}
+            if not skip_images:
+                for path in {row['imagePath'] for row in batch if row['imagePath']}:
+                    futures[path] = pool.submit(process_image, path, max_size)
+            if pending is not None:
+                _write_batch(conn, *pending, stats)
+            pending = (batch, futures) if chunk else None
+    conn.close()
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-import a menu sheet (XLSX or CSV) into cafe_menu.db.")
+    parser.add_argument("sheet", help="menu sheet in the app's export layout")
+    parser.add_argument("--db", default=MENU_DB)
+    parser.add_argument("--category", default="", help="category for rows that leave it blank")
+    parser.add_argument("--images", help="folder holding the 'Image File' references (default: images/ next to the sheet)")
+    parser.add_argument("--skip-images", action="store_true")
+    parser.add_argument("--max-size", type=int, default=512, help="longest edge of stored images in px")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    stats = import_menu(args.sheet, args.db, args.category, args.images, args.batch_size,
+                        args.workers, args.max_size, args.skip_images)
+    for message in stats.skipped[:20] + stats.image_errors[:20]:
+        print(f"  {message}")
+    print(f"Successfully imported {stats.line()} into {args.db}")
+
+if __name__ == '__main__':
+    main()
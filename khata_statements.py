@@ -0,0 +1,370 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import itertools
+from collections import deque
+from datetime import date, timedelta
+from multiprocessing import Pool
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Frame, Spacer
+from reportlab.platypus.doctemplate import LayoutError
+
+from generate_pdf_guide import (NumberedCanvas, C_PRIMARY, C_DARK, C_MUTED, C_BORDER, C_BG_LIGHT, C_CALLOUT_BG,
+                                part_name)
+from cafe_schema import CREDIT_DB, PERSONS_DB
+from cafe_queries import TRANSACTIONS_SQL
+
+PAGE_MARGIN = 54
+LEDGER_COLS = [62, 62, 180, 66, 66, 68]
+SUMMARY_COLS = [84] * 6
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+class StatementCanvas(NumberedCanvas):
+    header_title = "SIMS CAFE — CUSTOMER CREDIT STATEMENTS (KHATA)"
+    header_subtitle = "Statement of Account"
+    footer_text = "SIMS CAFE Management System | Credit balances from credit_transactions.db"
+    first_decorated_page = 1
+
+class StreamingStatementCanvas(StatementCanvas):
+    # Combined runs stamp pages as they finish, like the reprint canvas, so
+    # statements are not held back for "Page X of Y". ReportLab still keeps
+    # each finished page's content until save(), so memory grows with the
+    # statements in a file (roughly 157 MB peak for 9.6k); --part-size caps
+    # it by splitting the output.
+    def showPage(self):
+        self.draw_header_footer()
+        super(NumberedCanvas, self).showPage()
+
+    def save(self):
+        super(NumberedCanvas, self).save()
+
+def load_persons(db_path):
+    persons = {}
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            for pid, name, phone, place, credit in conn.execute(
+                    "SELECT id, name, phoneNumber, place, credit FROM persons WHERE is_deleted = 0"):
+                persons[pid] = {'name': name, 'phone': phone, 'place': place, 'credit': credit or 0.0}
+        finally:
+            conn.close()
+    return persons
+
+def iter_customers(db_path, persons, end):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(TRANSACTIONS_SQL, (end,))
+        for customer_id, rows in itertools.groupby(cursor, key=lambda r: r[0]):
+            rows = [r[1:] for r in rows]
+            person = persons.get(customer_id) or {'name': rows[-1][0], 'phone': "", 'place': "", 'credit': None}
+            yield customer_id, person, rows
+    finally:
+        conn.close()
+
+def build_ledger(rows, start, end):
+    # A credit sale is owed from createdAt; the app settles it by flipping
+    # isCompleted and stamping updated_at, which is taken as the payment date.
+    opening = 0.0
+    entries = []
+    still_open = 0
+    for _, order_number, amount, created_at, service_type, completed, updated_at in rows:
+        amount = amount or 0.0
+        paid_at = (updated_at or created_at) if completed else None
+        if paid_at is None or paid_at >= end:
+            still_open += 1
+        if created_at < start:
+            if paid_at is None or paid_at >= start:
+                opening += amount
+        else:
+            entries.append((created_at, 0, order_number, f"Credit sale · {service_type}", amount, 0.0))
+        if paid_at is not None and start <= paid_at < end:
+            entries.append((paid_at, 1, order_number, "Payment received", 0.0, amount))
+    entries.sort()
+    return opening, entries, still_open
+
+def layout_statement(job):
+    customer_id, person, rows, start, end, places, business = job
+    opening, entries, still_open = build_ledger(rows, start, end)
+    money = lambda v: f"{v:,.{places}f}" if v else ""
+
+    balance = opening
+    ledger = [["Date", "Ref", "Description", "Debit", "Credit", "Balance"],
+              [start[:10], "", "Opening balance", "", "", f"{opening:,.{places}f}"]]
+    charges = payments = 0.0
+    for stamp, _, order_number, description, debit, credit in entries:
+        balance += debit - credit
+        charges += debit
+        payments += credit
+        ledger.append([stamp[:10], f"#{order_number}", description[:48], money(debit), money(credit),
+                       f"{balance:,.{places}f}"])
+    ledger.append(["", "", "Closing balance", money(charges), money(payments), f"{balance:,.{places}f}"])
+
+    last_day = (date.fromisoformat(end[:10]) - timedelta(days=1)).isoformat()
+    on_account = person['credit']
+    return {
+        'customer_id': customer_id,
+        'name': person['name'],
+        'closing': balance,
+        'active': bool(entries),
+        'header': [
+            [business, f"{person['name']}"],
+            ["CUSTOMER STATEMENT", " · ".join(filter(None, [person['phone'], person['place']]))],
+            [f"Period {start[:10]} to {last_day}", f"Customer ID {customer_id}"],
+        ],
+        'summary': [
+            ["Opening", "Charges", "Payments", "Closing", "Open credits", "Balance on record"],
+            [f"{opening:,.{places}f}", f"{charges:,.{places}f}", f"{payments:,.{places}f}", f"{balance:,.{places}f}",
+             str(still_open), "-" if on_account is None else f"{on_account:,.{places}f}"],
+        ],
+        'ledger': ledger,
+    }
+
+def statement_flowables(layout):
+    header = Table(layout['header'], colWidths=[252, 252])
+    header.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), C_PRIMARY),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#93C5FD")),
+        ('FONT', (0, 0), (-1, 0), FONT_BOLD, 12),
+        ('FONT', (0, 1), (-1, -1), FONT, 8),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('PADDING', (0, 0), (-1, -1), 6),
+    ]))
+    summary = Table(layout['summary'], colWidths=SUMMARY_COLS)
+    summary.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), C_CALLOUT_BG),
+        ('FONT', (0, 0), (-1, 0), FONT, 7, 9),
+        ('TEXTCOLOR', (0, 0), (-1, 0), C_MUTED),
+        ('FONT', (0, 1), (-1, 1), FONT_BOLD, 9),
+        ('TEXTCOLOR', (0, 1), (-1, 1), C_DARK),
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('PADDING', (0, 0), (-1, -1), 4),
+    ]))
+    ledger = Table(layout['ledger'], colWidths=LEDGER_COLS, repeatRows=1)
+    ledger.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), FONT, 7, 9),
+        ('FONT', (0, 0), (-1, 0), FONT_BOLD, 7, 9),
+        ('BACKGROUND', (0, 0), (-1, 0), C_PRIMARY),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), C_DARK),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
+        ('FONT', (0, -1), (-1, -1), FONT_BOLD, 7, 9),
+        ('LINEABOVE', (0, -1), (-1, -1), 0.75, C_DARK),
+        ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -2), 0.25, C_BORDER),
+        ('PADDING', (0, 0), (-1, -1), 3),
+    ]))
+    return [header, Spacer(1, 8), summary, Spacer(1, 10), ledger]
+
+UNSAFE_CHARS = re.compile(r"[^\w\-]+")
+
+def _file_name(layout):
+    name = UNSAFE_CHARS.sub("_", layout['name']).strip("_")[:40] or "customer"
+    return f"{name}_{UNSAFE_CHARS.sub('_', layout['customer_id'])}.pdf"
+
+def render_customer_files(job):
+    # Per-customer mode: the worker lays out and writes its own files.
+    # Returns (written, failed customer ids).
+    jobs, out_dir, keep_zero = job
+    written = 0
+    failed = []
+    for item in jobs:
+        layout = layout_statement(item)
+        if not keep_zero and not layout['active'] and abs(layout['closing']) < 1e-9:
+            continue
+        path = os.path.join(out_dir, _file_name(layout))
+        doc = SimpleDocTemplate(path, pagesize=letter,
+                                leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN, topMargin=PAGE_MARGIN,
+                                bottomMargin=PAGE_MARGIN, title=f"Statement {layout['name']}")
+        try:
+            doc.build(statement_flowables(layout), canvasmaker=StatementCanvas)
+        except LayoutError:
+            failed.append(layout['customer_id'])
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        written += 1
+    return written, failed
+
+def layout_chunk(jobs):
+    return [layout_statement(job) for job in jobs]
+
+class CombinedWriter:
+    # The file is only created with its first statement, so a run with
+    # nothing to issue writes no PDF rather than a header-only page.
+    def __init__(self, filename):
+        self.filename = filename
+        self.canv = None
+        self.statements = 0
+
+    def _frame(self):
+        return Frame(PAGE_MARGIN, PAGE_MARGIN, letter[0] - 2 * PAGE_MARGIN, letter[1] - 2 * PAGE_MARGIN,
+                     leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+
+    def _check_fits(self, layout, flowables):
+        # Tables split between rows only, so a statement can be placed iff
+        # every row (with the repeated column header) fits on one page.
+        # Checked before drawing, as a half-drawn statement cannot be taken
+        # back out of the combined PDF.
+        width, height = letter[0] - 2 * PAGE_MARGIN, letter[1] - 2 * PAGE_MARGIN
+        for flowable in flowables:
+            flowable.wrap(width, height)
+            rows = getattr(flowable, '_rowHeights', None) or [flowable.height]
+            repeat = getattr(flowable, 'repeatRows', 0)
+            if max(rows) + (sum(rows[:repeat]) if repeat else 0) > height:
+                raise LayoutError(f"{layout['customer_id']}: a statement row is taller than a page")
+
+    def add(self, layout):
+        # Every statement starts on a fresh page; long ledgers split across
+        # pages and repeat their column header.
+        pending = statement_flowables(layout)
+        self._check_fits(layout, pending)
+        if self.canv is None:
+            self.canv = StreamingStatementCanvas(self.filename, pagesize=letter)
+        elif self.statements:
+            self.canv.showPage()
+        frame = self._frame()
+        while pending:
+            flowable = pending.pop(0)
+            if frame.add(flowable, self.canv):
+                continue
+            parts = frame.split(flowable, self.canv)
+            if len(parts) >= 2 and frame.add(parts[0], self.canv):
+                pending[:0] = parts[1:]
+            elif isinstance(flowable, Spacer):
+                continue
+            elif frame._atTop:
+                raise LayoutError(f"{layout['customer_id']}: block taller than a page")
+            else:
+                pending.insert(0, flowable)
+            self.canv.showPage()
+            frame = self._frame()
+        self.statements += 1
+
+    def close(self):
+        # True if a file was written
+        if self.canv is None:
+            return False
+        self.canv.showPage()
+        self.canv.save()
+        return True
+
+def _chunks(customers, start, end, places, business, size):
+    customers = iter(customers)
+    while True:
+        chunk = [(cid, person, rows, start, end, places, business)
+                 for cid, person, rows in itertools.islice(customers, size)]
+        if not chunk:
+            return
+        yield chunk
+
+def generate(db_path, persons_db, start, end, output, per_customer=False, workers=None, chunk_size=200,
+             places=3, business="SIMS CAFE", keep_zero=False, part_size=None):
+    # Returns (statements, files, failed customer ids); files is the output
+    # folder in per-customer mode and one PDF per part_size statements
+    # otherwise.
+    persons = load_persons(persons_db)
+    chunks = _chunks(iter_customers(db_path, persons, end), start, end, places, business, chunk_size)
+    count = 0
+    failed = []
+    with Pool(processes=workers) as pool:
+        if per_customer:
+            os.makedirs(output, exist_ok=True)
+            # imap_unordered would pull every chunk off the ledger scan up
+            # front; submitting through a window keeps a couple of chunks per
+            # worker in memory however many customers there are.
+            window = 2 * (workers or os.cpu_count() or 1)
+            in_flight = deque()
+            for chunk in itertools.chain(chunks, [None]):
+                while in_flight and (chunk is None or len(in_flight) >= window):
+                    written, chunk_failed = in_flight.popleft().get()
+                    count += written
+                    failed += chunk_failed
+                    print(f"Rendered {count} statements", file=sys.stderr)
+                if chunk is not None:
+                    in_flight.append(pool.apply_async(render_customer_files, ((chunk, output, keep_zero),)))
+            return count, [output], failed
+        files = []
+        writer = CombinedWriter(part_name(output, 1) if part_size else output)
+        # Ledgers are laid out in the pool one chunk ahead of drawing, so at
+        # most two chunks of customers are waiting at any time.
+        chunk = next(chunks, None)
+        pending = pool.map_async(layout_chunk, [chunk]) if chunk else None
+        while pending is not None:
+            layouts = pending.get()[0]
+            chunk = next(chunks, None)
+            pending = pool.map_async(layout_chunk, [chunk]) if chunk else None
+            for layout in layouts:
+                if keep_zero or layout['active'] or abs(layout['closing']) >= 1e-9:
+                    if part_size and writer.statements == part_size:
+                        writer.close()
+                        files.append(writer.filename)
+                        writer = CombinedWriter(part_name(output, len(files) + 1))
+                    try:
+                        writer.add(layout)
+                    except LayoutError:
+                        failed.append(layout['customer_id'])
+                        continue
+                    count += 1
+            print(f"Rendered {count} statements", file=sys.stderr)
+        if writer.close():
+            files.append(writer.filename)
+        return count, files, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate month-end Khata (customer credit) statements with running balances.")
+    parser.add_argument("--db", default=CREDIT_DB)
+    parser.add_argument("--persons-db", default=PERSONS_DB)
+    parser.add_argument("--month", help="statement month, YYYY-MM (default: last month)")
+    parser.add_argument("--from", dest="first", help="first day, YYYY-MM-DD (instead of --month)")
+    parser.add_argument("--to", dest="last", help="last day, inclusive")
+    parser.add_argument("--per-customer", action="store_true", help="one PDF per customer in the output folder")
+    parser.add_argument("--include-settled", action="store_true",
+                        help="also issue statements with no activity and a zero balance")
+    parser.add_argument("--business-name", default="SIMS CAFE")
+    parser.add_argument("--decimal-places", type=int, default=3)
+    parser.add_argument("-o", "--output", help="PDF file, or folder with --per-customer")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--part-size", type=int, default=None,
+                        help="statements per combined PDF (NAME_001.pdf, ...); bounds memory for very large runs")
+    args = parser.parse_args(argv)
+
+    if args.first:
+        first = date.fromisoformat(args.first)
+        last = date.fromisoformat(args.last) if args.last else date.today()
+    else:
+        if args.month:
+            first = date.fromisoformat(args.month + "-01")
+        else:
+            first = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    if not os.path.exists(args.db):
+        sys.exit(f"Database not found: {args.db}")
+    output = args.output or (f"khata_{first.isoformat()[:7]}" if args.per_customer
+                             else f"SIMS_Cafe_Khata_{first.isoformat()}_{last.isoformat()}.pdf")
+
+    started = time.perf_counter()
+    count, files, failed = generate(args.db, args.persons_db, first.isoformat(),
+                                    (last + timedelta(days=1)).isoformat(), output, args.per_customer, args.workers,
+                                    args.chunk_size, args.decimal_places, args.business_name, args.include_settled,
+                                    args.part_size)
+    elapsed = time.perf_counter() - started
+    if failed:
+        for customer_id in failed[:20]:
+            print(f"  {customer_id}: statement does not fit the page, not issued")
+        sys.exit(f"Generated {count} statements in {', '.join(files) or output} ({elapsed:.1f}s); "
+                 f"{len(failed)} customers failed")
+    if not files:
+        print(f"No statements to issue for {first.isoformat()} to {last.isoformat()} ({elapsed:.1f}s)")
+        return
+    print(f"Successfully generated {count} statements in {', '.join(files)} ({elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+import json
+import time
+import base64
+import bisect
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from printer_emulator import latency_summary
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+ENTITIES = ('orders', 'menuItems', 'tables', 'persons', 'deliveryBoys', 'creditTransactions')
+# menu_items predates the snake_case sync columns
+STAMP_FIELD = {'menuItems': 'lastUpdated'}
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def ws_frame(payload, opcode=0x1, mask=False):
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        header.append(mask_bit | n)
+    elif n < 65536:
+        header += bytes([mask_bit | 126]) + n.to_bytes(2, 'big')
+    else:
+        header += bytes([mask_bit | 127]) + n.to_bytes(8, 'big')
+    if mask:
+        key = random.randbytes(4)
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+        header += key
+    return bytes(header) + payload
+
+async def ws_read(reader):
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = int.from_bytes(await reader.readexactly(2), 'big')
+    elif n == 127:
+        n = int.from_bytes(await reader.readexactly(8), 'big')
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if key:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return b0 & 0x0F, payload
+
+async def read_http_message(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return lines[0], headers, body
+
+class EntityIndex:
+    # Rows kept in updated_at order so an incremental pull is a bisect plus
+    # a slice instead of a scan of the whole entity.
+    def __init__(self, stamp):
+        self.stamp = stamp
+        self.rows = {}
+        self.stamps = []
+        self.ids = []
+
+    def upsert(self, row):
+        key = str(row['id'])
+        old = self.rows.get(key)
+        if old is not None:
+            i = bisect.bisect_left(self.stamps, old[self.stamp])
+            while self.ids[i] != key:
+                i += 1
+            del self.stamps[i], self.ids[i]
+        self.rows[key] = row
+        i = bisect.bisect_right(self.stamps, row[self.stamp])
+        self.stamps.insert(i, row[self.stamp])
+        self.ids.insert(i, key)
+
+    def since(self, stamp):
+        start = bisect.bisect_right(self.stamps, stamp) if stamp else 0
+        return [self.rows[k] for k in self.ids[start:]]
+
+class StandInHost:
+    def __init__(self, server_name="SIMS Host (stand-in)", seed=7, menu=300, orders=2000, persons=500, tables=30):
+        self.server_name = server_name
+        self.tables = {name: EntityIndex(STAMP_FIELD.get(name, 'updated_at')) for name in ENTITIES}
+        self.clients = set()
+        self.requests = 0
+        self.version = 0
+        self._full_cache = (None, b"")
+        self._seed(random.Random(seed), menu, orders, persons, tables)
+
+    def _seed(self, rng, menu, orders, persons, tables):
+        stamp = now_iso()
+        for i in range(1, menu + 1):
+            self.tables['menuItems'].upsert({
+                'id': i, 'name': f"Menu item {i}", 'price': round(rng.uniform(1, 25), 2),
+                'category': rng.choice(("Coffee", "Tea", "Burgers", "Desserts", "Juices")),
+                'isAvailable': 1, 'isDeleted': 0, 'lastUpdated': stamp})
+        for i in range(1, tables + 1):
+            self.tables['tables'].upsert({'id': i, 'number': i, 'status': 'available', 'updated_at': stamp})
+        for i in range(1, persons + 1):
+            self.tables['persons'].upsert({
+                'id': i, 'name': f"Customer {i}", 'phoneNumber': f"05{rng.randrange(10**7, 10**8)}",
+                'credit': 0.0, 'updated_at': stamp, 'is_deleted': 0})
+        for i in range(1, orders + 1):
+            self.tables['orders'].upsert(self._order(rng, i, "host", stamp))
+
+    @staticmethod
+    def _order(rng, order_id, device_id, stamp):
+        items = [{'menu_item_id': rng.randrange(1, 300), 'name': "Item", 'price': 3.5,
+                  'quantity': rng.randrange(1, 4), 'kitchen_note': ""} for _ in range(rng.randrange(1, 6))]
+        total = sum(i['price'] * i['quantity'] for i in items)
+        return {'id': order_id, 'staff_device_id': device_id, 'service_type': "Dining - Table 1",
+                'subtotal': total, 'tax': 0.0, 'discount': 0.0, 'total': total, 'status': 'pending',
+                'items': items, 'created_at': stamp, 'updated_at': stamp, 'is_synced': 1, 'is_deleted': 0}
+
+    def sync_response(self, since=None):
+        body = {'serverTime': now_iso()}
+        for name, table in self.tables.items():
+            rows = table.since(since)
+            if since is None:
+                rows = [r for r in rows if not (r.get('is_deleted') or r.get('isDeleted'))]
+            body[name] = rows
+        return body
+
+    def apply_push(self, payload):
+        stamp = now_iso()
+        for name in ENTITIES:
+            for row in payload.get(name) or []:
+                row = dict(row)
+                row[self.tables[name].stamp] = stamp
+                self.tables[name].upsert(row)
+        self.version += 1
+        return {'status': 'ok', 'serverTime': stamp, 'accepted': True}
+
+    def full_snapshot(self):
+        # Onboarding tablets arrive in bursts; encode the snapshot once per
+        # change instead of once per request.
+        version, data = self._full_cache
+        if version != self.version:
+            data = json.dumps(self.sync_response(None)).encode()
+            self._full_cache = (self.version, data)
+        return data
+
+    def broadcast(self, raw, exclude=None):
+        frame = ws_frame(raw)
+        for writer in list(self.clients):
+            if writer is exclude:
+                continue
+            try:
+                writer.write(frame)
+            except (ConnectionError, RuntimeError):
+                self.clients.discard(writer)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line, headers, body = await read_http_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                method, path = request_line.split(" ")[:2]
+                self.requests += 1
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_ws(reader, writer, headers)
+                    return
+                status, payload = self._route(method, path, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode() + data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _route(self, method, path, body):
+        try:
+            if method == "GET" and path == "/api/ping":
+                return "200 OK", {'status': 'ok', 'serverName': self.server_name,
+                                  'timestamp': now_iso(), 'connectedClients': len(self.clients)}
+            if method == "GET" and path == "/api/sync/full":
+                return "200 OK", self.full_snapshot()
+            if method == "POST" and path == "/api/sync/incremental":
+                request = json.loads(body or b"{}")
+                # The app sends lastSyncedAt; the guide documents it as since
+                return "200 OK", self.sync_response(request.get('lastSyncedAt') or request.get('since'))
+            if method == "POST" and path == "/api/sync/push":
+                return "200 OK", self.apply_push(json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            return "500 Internal Server Error", {'error': str(e)}
+        return "404 Not Found", {'error': f"no route for {method} {path}"}
+
+    async def _serve_ws(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        self.clients.add(writer)
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(ws_frame(b"", opcode=0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(ws_frame(payload, opcode=0xA))
+                elif opcode == 0x1:
+                    # Re-broadcast to every other tablet, as LanSyncServer does
+                    self.broadcast(payload, exclude=writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(writer)
+
+class Tablet:
+    def __init__(self, device_id, host, port, stats, rng):
+        self.device_id = device_id
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.rng = rng
+        self.last_synced_at = None
+        self.order_seq = 0
+
+    async def _request(self, name, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        start = time.perf_counter()
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        status, _, data = await read_http_message(self.reader)
+        self.stats.latency[name].append((time.perf_counter() - start) * 1000)
+        self.stats.bytes_in += len(data)
+        if " 200 " not in status + " ":
+            self.stats.errors[name] += 1
+            return {}
+        return json.loads(data)
+
+    async def connect(self):
+        # One keep-alive HTTP connection per tablet, like the app's client
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.ws_reader, self.ws_writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(random.randbytes(16)).decode()
+        self.ws_writer.write(f"GET /ws HTTP/1.1\r\nHost: {self.host}\r\nUpgrade: websocket\r\n"
+                             f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                             f"Sec-WebSocket-Version: 13\r\n\r\n".encode())
+        await self.ws_reader.readuntil(b"\r\n\r\n")
+
+    async def listen(self):
+        try:
+            while True:
+                opcode, payload = await ws_read(self.ws_reader)
+                if opcode == 0x8:
+                    return
+                if opcode == 0x1:
+                    event = json.loads(payload)
+                    sent = event['data'].get('sentAt')
+                    if sent:
+                        self.stats.fanout.append((time.time() - sent) * 1000)
+                    self.stats.events += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def onboard(self):
+        await self._request('ping', "GET", "/api/ping")
+        snapshot = await self._request('full', "GET", "/api/sync/full")
+        self.last_synced_at = snapshot.get('serverTime')
+
+    async def poll(self):
+        delta = await self._request('incremental', "POST", "/api/sync/incremental",
+                                    {'lastSyncedAt': self.last_synced_at})
+        self.last_synced_at = delta.get('serverTime', self.last_synced_at)
+
+    async def push_order(self):
+        self.order_seq += 1
+        order_id = f"{self.device_id}-{self.order_seq}"
+        order = StandInHost._order(self.rng, order_id, self.device_id, now_iso())
+        await self._request('push', "POST", "/api/sync/push",
+                            {'deviceId': self.device_id, 'lastSyncedAt': self.last_synced_at or "", 'orders': [order]})
+        table = self.rng.randrange(1, 31)
+        for event, data in (('order_created', {'id': order_id}), ('table_updated', {'id': table, 'status': 'occupied'})):
+            data['sentAt'] = time.time()
+            message = {'event': event, 'data': data, 'deviceId': self.device_id, 'timestamp': now_iso()}
+            self.ws_writer.write(ws_frame(json.dumps(message).encode(), mask=True))
+        await self.ws_writer.drain()
+
+    async def run(self, duration, poll_interval, push_interval):
+        listener = asyncio.create_task(self.listen())
+        await self.onboard()
+        deadline = time.perf_counter() + duration
+        next_push = time.perf_counter() + self.rng.uniform(0, push_interval)
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * poll_interval)
+            await self.poll()
+            if time.perf_counter() >= next_push:
+                await self.push_order()
+                next_push += push_interval
+        self.ws_writer.write(ws_frame(b"", opcode=0x8, mask=True))
+        self.writer.close()
+        await asyncio.wait([listener], timeout=1.0)
+        listener.cancel()
+        self.ws_writer.close()
+
+class LoadStats:
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.fanout = []
+        self.events = 0
+        self.bytes_in = 0
+
+async def run_round(host, port, clients, duration, poll_interval, push_interval, seed):
+    stats = LoadStats()
+    tablets = [Tablet(f"tablet-{n:03d}", host, port, stats, random.Random(seed + n)) for n in range(clients)]
+    await asyncio.gather(*(t.connect() for t in tablets))
+    started = time.perf_counter()
+    await asyncio.gather(*(t.run(duration, poll_interval, push_interval) for t in tablets))
+    elapsed = time.perf_counter() - started
+    requests = sum(len(v) for v in stats.latency.values())
+    result = {
+        'clients': clients,
+        'requests_per_s': round(requests / elapsed, 1),
+        'mb_per_s': round(stats.bytes_in / elapsed / 1e6, 2),
+        'events_received': stats.events,
+        'fanout': latency_summary(stats.fanout),
+        'errors': dict(stats.errors),
+    }
+    for name, samples in stats.latency.items():
+        result[name] = latency_summary(samples)
+    return result
+
+def print_round(r):
+    print(f"clients={r['clients']:<4} req/s={r['requests_per_s']:<8} MB/s={r['mb_per_s']:<6} "
+          f"events={r['events_received']} errors={sum(r['errors'].values())}")
+    for name in ('full', 'incremental', 'push', 'fanout'):
+        s = r.get(name)
+        if s and s['count']:
+            print(f"    {name:<12} n={s['count']:<6} p50={s['p50_ms']:>8}ms p99={s['p99_ms']:>8}ms max={s['max_ms']:>8}ms")
+
+async def serve(args):
+    host = StandInHost(seed=args.seed, orders=args.orders)
+    server = await asyncio.start_server(host.handle, args.host, args.port, backlog=1024)
+    print(f"LAN sync stand-in host listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+async def run(args):
+    server = None
+    if args.target is None:
+        stand_in = StandInHost(seed=args.seed, orders=args.orders)
+        server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0, backlog=1024)
+        host, port = server.sockets[0].getsockname()[:2]
+    else:
+        host, _, port = args.target.partition(":")
+        port = int(port or 8642)
+    results = []
+    for clients in args.clients:
+        result = await run_round(host, port, clients, args.duration, args.poll_interval, args.push_interval, args.seed)
+        print_round(result)
+        results.append(result)
+    if server is not None:
+        server.close()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the LAN sync host API with simulated waiter tablets.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve", help="run only the stand-in host")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8642)
+    p_serve.add_argument("--orders", type=int, default=2000, help="orders seeded into the host")
+    p_serve.add_argument("--seed", type=int, default=7)
+
+    p_run = sub.add_parser("run", help="simulate tablets (against an in-process stand-in unless --target is given)")
+    p_run.add_argument("--target", help="host:port of a running host, e.g. 192.168.1.100:8642")
+    p_run.add_argument("--clients", type=lambda s: [int(x) for x in s.split(",")], default=[5, 10, 25, 50],
+                       help="comma separated client counts, one round each")
+    p_run.add_argument("--duration", type=float, default=10.0, help="seconds per round")
+    p_run.add_argument("--poll-interval", type=float, default=1.0)
+    p_run.add_argument("--push-interval", type=float, default=3.0)
+    p_run.add_argument("--orders", type=int, default=2000, help="orders seeded into the in-process host")
+    p_run.add_argument("--seed", type=int, default=7)
+    p_run.add_argument("--json", help="also write the per-round results here")
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args) if args.mode == "serve" else run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+
+from cafe_schema import DATABASES
+
+# menu_items predates the snake_case sync columns
+STAMP_COLUMNS = ("updated_at", "lastUpdated")
+TOMBSTONE_COLUMNS = ("is_deleted", "isDeleted")
+# Rows without a stamp of their own travel with their parent, like
+# _applyOrderItems does for every applied order that arrives with items
+CHILD_TABLES = {'orders': [('order_items', 'order_id')]}
+# The cloud upload flag describes the device the row came from, not the
+# merged copy. Applied rows are marked not uploaded so the merged device
+# pushes them on its next cloud sync; the server keeps the newest write,
+# so pushing a row the cloud already has is harmless, while copying a
+# stale "synced" flag could keep a row off the cloud for good.
+RESET_COLUMNS = {'is_synced': "0", 'synced_at': "NULL"}
+FETCH_SIZE = 5000
+REPORT_FIELDS = ["database", "table", "key", "winner", "kind", "target_updated", "source_updated",
+                 "target_deleted", "source_deleted"]
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def table_info(conn, schema, table):
+    return conn.execute(f"PRAGMA {schema}.table_info({quote(table)})").fetchall()
+
+def plan_tables(conn):
+    # Returns (plans, skipped): one plan per table both snapshots can merge
+    plans, skipped = [], []
+    names = [n for (n,) in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' "
+                                        "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    for name in names:
+        target = table_info(conn, "main", name)
+        source = table_info(conn, "src", name)
+        if not source:
+            skipped.append((name, "not in source"))
+            continue
+        keys = [row[1] for row in sorted(target, key=lambda r: r[5]) if row[5]]
+        if len(keys) != 1:
+            skipped.append((name, "no single-column primary key"))
+            continue
+        source_columns = {row[1] for row in source}
+        shared = [row[1] for row in target if row[1] in source_columns]
+        stamp = next((c for c in STAMP_COLUMNS if c in shared), None)
+        if stamp is None:
+            if not any(name == child for children in CHILD_TABLES.values() for child, _ in children):
+                skipped.append((name, "no updated_at column"))
+            continue
+        key_type = next(row[2] for row in target if row[1] == keys[0])
+        plans.append({
+            'table': name,
+            'key': keys[0],
+            'stamp': stamp,
+            'tombstone': next((c for c in TOMBSTONE_COLUMNS if c in shared), None),
+            'columns': shared,
+            'missing': sorted(source_columns.symmetric_difference(row[1] for row in target)),
+            # An INTEGER PRIMARY KEY is the rowid: the table is stored in key
+            # order already and needs no index to be scanned in it
+            'rowid_key': key_type.upper() == "INTEGER",
+            'children': [child for child in CHILD_TABLES.get(name, []) if table_info(conn, "src", child[0])
+                         and table_info(conn, "main", child[0])],
+        })
+    return plans, skipped
+
+def ordered_scan(conn, schema, plan):
+    # Yields (key, stamp, deleted) in key order. Text keys are copied once
+    # into a temp table with a covering index, so the scan is one pass over
+    # three narrow columns instead of a key-index walk plus a row lookup
+    # per key.
+    key, stamp = quote(plan['key']), quote(plan['stamp'])
+    deleted = quote(plan['tombstone']) if plan['tombstone'] else "0"
+    if plan['rowid_key']:
+        sql = f"SELECT {key}, {stamp}, {deleted} FROM {schema}.{quote(plan['table'])} ORDER BY {key}"
+    else:
+        scratch = f"_lww_{schema}_{plan['table']}"
+        conn.execute(f"DROP TABLE IF EXISTS temp.{quote(scratch)}")
+        conn.execute(f"CREATE TEMP TABLE {quote(scratch)} AS SELECT {key} AS k, {stamp} AS s, {deleted} AS d "
+                     f"FROM {schema}.{quote(plan['table'])}")
+        conn.execute(f"CREATE INDEX temp.{quote(scratch + '_k')} ON {quote(scratch)} (k COLLATE BINARY, s, d)")
+        sql = f"SELECT k, s, d FROM temp.{quote(scratch)} ORDER BY k COLLATE BINARY"
+    cur = conn.execute(sql)
+    while True:
+        rows = cur.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+def _order(value):
+    # SQLite's ordering across storage classes: NULL, numbers, text, blobs
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, value) if isinstance(value, str) else (3, value)
+
+def before(a, b):
+    try:
+        return a < b
+    except TypeError:
+        return _order(a) < _order(b)
+
+def instant(stamp):
+    moment = datetime.fromisoformat(stamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def source_wins(target_stamp, source_stamp):
+    # Same rule as _shouldApplyRemote in lan_sync_engine.dart: a missing
+    # remote stamp never wins, a missing local one always loses, strictly
+    # newer wins and an unparseable stamp is applied to be safe.
+    if source_stamp is None:
+        return False
+    if target_stamp is None:
+        return True
+    if source_stamp == target_stamp:
+        return False
+    try:
+        return instant(source_stamp) > instant(target_stamp)
+    except (TypeError, ValueError):
+        return True
+
+def changed_since(stamp, since):
+    try:
+        return stamp is None or instant(stamp) > since
+    except (TypeError, ValueError):
+        return True
+
+def merge_join(target_rows, source_rows):
+    # Yields (key, target_row, source_row) for every key on either side,
+    # with None for the side that lacks it. Both inputs are in key order,
+    # so each is read exactly once.
+    target = next(target_rows, None)
+    source = next(source_rows, None)
+    while target is not None or source is not None:
+        if source is None or (target is not None and before(target[0], source[0])):
+            yield target[0], target, None
+            target = next(target_rows, None)
+        elif target is None or before(source[0], target[0]):
+            yield source[0], None, source
+            source = next(source_rows, None)
+        else:
+            yield target[0], target, source
+            target = next(target_rows, None)
+            source = next(source_rows, None)
+
+def conflict_kind(winner, loser):
+    if winner[2] and not loser[2]:
+        return "delete"
+    if loser[2] and not winner[2]:
+        return "undelete"
+    return "update"
+
+def decide(conn, plan, since, report, database):
+    stats = {'table': plan['table'], 'target': 0, 'source': 0, 'inserted': 0, 'updated': 0,
+             'kept': 0, 'same': 0, 'tombstones': 0, 'conflicts': 0}
+    conn.execute("DROP TABLE IF EXISTS temp._lww_winners")
+    conn.execute("CREATE TEMP TABLE _lww_winners (k)")
+    winners = []
+    pairs = merge_join(ordered_scan(conn, "main", plan), ordered_scan(conn, "src", plan))
+    for key, target, source in pairs:
+        if target is not None:
+            stats['target'] += 1
+        if source is None:
+            continue
+        stats['source'] += 1
+        if target is None:
+            stats['inserted'] += 1
+            stats['tombstones'] += bool(source[2])
+            winners.append((key,))
+        elif target[1] == source[1]:
+            stats['same'] += 1
+        else:
+            won = source_wins(target[1], source[1])
+            if won:
+                stats['updated'] += 1
+                stats['tombstones'] += bool(source[2])
+                winners.append((key,))
+            else:
+                stats['kept'] += 1
+            if since is None or (changed_since(target[1], since) and changed_since(source[1], since)):
+                stats['conflicts'] += 1
+                if report:
+                    winner, loser = (source, target) if won else (target, source)
+                    report.writerow([database, plan['table'], key, "source" if won else "target",
+                                     conflict_kind(winner, loser), target[1], source[1], target[2], source[2]])
+        if len(winners) >= FETCH_SIZE:
+            conn.executemany("INSERT INTO temp._lww_winners (k) VALUES (?)", winners)
+            winners.clear()
+    conn.executemany("INSERT INTO temp._lww_winners (k) VALUES (?)", winners)
+    return stats
+
+def apply_winners(conn, plan, batch_size):
+    # Copies the winning source rows over in key order, one transaction per
+    # batch so a long merge never holds the write lock for the whole table.
+    table, key = quote(plan['table']), quote(plan['key'])
+    columns = ", ".join(quote(c) for c in plan['columns'])
+    values = ", ".join(RESET_COLUMNS.get(c, quote(c)) for c in plan['columns'])
+    batch = "SELECT k FROM temp._lww_winners WHERE rowid > ? AND rowid <= ?"
+    statements = [f"INSERT OR REPLACE INTO main.{table} ({columns}) SELECT {values} FROM src.{table} "
+                  f"WHERE {key} IN ({batch})"]
+    for child, parent_key in plan['children']:
+        source_columns = {row[1] for row in table_info(conn, "src", child)}
+        # Child ids are per device; let the target number the copies
+        child_columns = ", ".join(quote(row[1]) for row in table_info(conn, "main", child)
+                                  if row[1] in source_columns and not row[5])
+        # A winner without child rows in the source keeps the target's, as
+        # the app skips _applyOrderItems for an order sent without items
+        parents = (f"{batch} AND EXISTS (SELECT 1 FROM src.{quote(child)} "
+                   f"WHERE {quote(parent_key)} = k)")
+        statements.append(f"DELETE FROM main.{quote(child)} WHERE {quote(parent_key)} IN ({parents})")
+        statements.append(f"INSERT INTO main.{quote(child)} ({child_columns}) SELECT {child_columns} "
+                          f"FROM src.{quote(child)} WHERE {quote(parent_key)} IN ({parents}) "
+                          f"ORDER BY {quote(parent_key)}, rowid")
+    total = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM temp._lww_winners").fetchone()[0]
+    for start in range(0, total, batch_size):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in statements:
+                conn.execute(sql, (start, start + batch_size))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return total
+
+def merge_database(target_path, source_path, since=None, report=None, batch_size=2000, dry_run=False):
+    # uri=True so the source can be attached read-only by URI
+    conn = sqlite3.connect(f"file:{target_path}", uri=True, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{source_path}?mode=ro",))
+        plans, skipped = plan_tables(conn)
+        database = os.path.basename(target_path)
+        results = []
+        for plan in plans:
+            started = time.perf_counter()
+            stats = decide(conn, plan, since, report, database)
+            if not dry_run:
+                apply_winners(conn, plan, batch_size)
+            stats['seconds'] = time.perf_counter() - started
+            stats['missing'] = plan['missing']
+            results.append(stats)
+        return results, skipped
+    finally:
+        conn.close()
+
+def copy_database(path, output):
+    # The backup API copies a consistent snapshot even with a live WAL
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    target = sqlite3.connect(output)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def pair_databases(target, source, output):
+    # Snapshot folders are merged database by database
+    if os.path.isdir(target) != os.path.isdir(source):
+        sys.exit("TARGET and SOURCE must both be database files or both be snapshot folders")
+    if not os.path.isdir(target):
+        return [(target, source, output or target)]
+    pairs = []
+    for name in DATABASES:
+        if os.path.exists(os.path.join(target, name)) and os.path.exists(os.path.join(source, name)):
+            pairs.append((os.path.join(target, name), os.path.join(source, name),
+                          os.path.join(output or target, name)))
+        else:
+            print(f"  {name}: not in both snapshots, skipped", file=sys.stderr)
+    return pairs
+
+def print_results(database, results, skipped):
+    print(database)
+    print(f"  {'table':<22} {'target':>9} {'source':>9} {'inserted':>9} {'updated':>9} {'kept':>7} "
+          f"{'same':>9} {'deleted':>8} {'conflicts':>9} {'seconds':>8}")
+    for r in results:
+        print(f"  {r['table']:<22} {r['target']:>9} {r['source']:>9} {r['inserted']:>9} {r['updated']:>9} "
+              f"{r['kept']:>7} {r['same']:>9} {r['tombstones']:>8} {r['conflicts']:>9} {r['seconds']:>8.2f}")
+        if r['missing']:
+            print(f"    columns not in both snapshots, left to their defaults: {', '.join(r['missing'])}")
+    for table, reason in skipped:
+        print(f"  {table:<22} skipped: {reason}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge two offline snapshots of the cafe databases with "
+                                                 "Last-Write-Wins on updated_at, as the LAN sync would.")
+    parser.add_argument("target", help="database file or snapshot folder that receives the changes (e.g. the host's)")
+    parser.add_argument("source", help="database file or snapshot folder to merge in (e.g. the offline tablet's)")
+    parser.add_argument("-o", "--output", help="write the merged copy here instead of changing TARGET in place")
+    parser.add_argument("--since", help="last successful sync (ISO time); only rows changed on both sides "
+                                        "after it are reported as conflicts")
+    parser.add_argument("--report", help="CSV file listing every conflict and its winner")
+    parser.add_argument("--batch-size", type=int, default=2000, help="winning rows applied per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args(argv)
+
+    for path in (args.target, args.source):
+        if not os.path.exists(path):
+            sys.exit(f"Snapshot not found: {path}")
+    try:
+        since = instant(args.since) if args.since else None
+    except ValueError:
+        sys.exit(f"--since is not an ISO date or time: {args.since}")
+    pairs = pair_databases(args.target, args.source, None if args.dry_run else args.output)
+    if not pairs:
+        sys.exit("No database is present in both snapshots")
+
+    started = time.perf_counter()
+    report_file = open(args.report, "w", newline="", encoding="utf-8") if args.report else None
+    report = csv.writer(report_file) if report_file else None
+    if report:
+        report.writerow(REPORT_FIELDS)
+    applied = conflicts = 0
+    try:
+        for target, source, output in pairs:
+            if output != target:
+                copy_database(target, output)
+            results, skipped = merge_database(output, source, since, report, args.batch_size, args.dry_run)
+            print_results(os.path.basename(output), results, skipped)
+            applied += sum(r['inserted'] + r['updated'] for r in results)
+            conflicts += sum(r['conflicts'] for r in results)
+    finally:
+        if report_file:
+            report_file.close()
+    elapsed = time.perf_counter() - started
+    if args.report:
+        print(f"Conflicts written to {args.report}")
+    if args.dry_run:
+        print(f"Dry run: {applied} rows would be applied, {conflicts} conflicts ({elapsed:.1f}s)")
+    else:
+        print(f"Successfully merged {applied} rows into {args.output or args.target}, "
+              f"{conflicts} conflicts resolved ({elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import itertools
+from datetime import date, timedelta
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, KeepTogether
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart, HorizontalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.legends import Legend
+
+from generate_pdf_guide import (
+    NumberedCanvas, build_styles, C_PRIMARY, C_SECONDARY, C_TEAL, C_MUTED, C_BG_LIGHT, C_BORDER, C_INDIGO
+)
+from cafe_schema import MENU_DB, ORDERS_DB
+from cafe_queries import ORDER_COLUMNS_SQL, ITEM_COLUMNS_SQL
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHART_WIDTH = 504
+UNCATEGORIZED = "Uncategorized"
+
+class AnalyticsCanvas(NumberedCanvas):
+    header_title = "SIMS CAFE — SALES ANALYTICS"
+    header_subtitle = "Revenue, Volume & Margin Report"
+    footer_text = "SIMS CAFE Management System | Generated from cafe_orders.db"
+    first_decorated_page = 1
+
+def _fetch_columns(conn, sql, params, width, batch_size=100000):
+    # Rows arrive as tuples; converting each batch right away keeps only
+    # one batch of Python objects alive next to the growing arrays.
+    cursor = conn.execute(sql, params)
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width)
+        chunks.append(flat.reshape(len(rows), width))
+    if not chunks:
+        return np.zeros((0, width))
+    return np.concatenate(chunks)
+
+def _menu_categories(menu_db):
+    by_id, by_name = {}, {}
+    if menu_db and os.path.exists(menu_db):
+        conn = sqlite3.connect(f"file:{menu_db}?mode=ro", uri=True)
+        try:
+            for item_id, name, category in conn.execute("SELECT id, name, category FROM menu_items"):
+                by_id[str(item_id)] = category
+                by_name.setdefault(name, category)
+        finally:
+            conn.close()
+    return by_id, by_name
+
+def load_columns(db_path, start, end, menu_db=MENU_DB, status="completed"):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        params = (start, end, status)
+        orders = _fetch_columns(conn, ORDER_COLUMNS_SQL, params, 5)
+        items = _fetch_columns(conn, ITEM_COLUMNS_SQL, params, 5)
+
+        # Categories live in cafe_menu.db. Resolve each distinct menu item
+        # once and broadcast the result back with the unique() inverse.
+        menu_ids, inverse = np.unique(items[:, 1].astype(np.int64), return_inverse=True)
+        by_id, by_name = _menu_categories(menu_db)
+        categories, codes = [], {}
+        unique_codes = np.empty(len(menu_ids), dtype=np.int64)
+        for n, menu_id in enumerate(menu_ids.tolist()):
+            category = by_id.get(str(menu_id))
+            if category is None and by_name:
+                row = conn.execute("SELECT name FROM order_items WHERE menu_item_id = ? LIMIT 1", (menu_id,)).fetchone()
+                category = by_name.get(row[0]) if row else None
+            category = category or UNCATEGORIZED
+            if category not in codes:
+                codes[category] = len(categories)
+                categories.append(category)
+            unique_codes[n] = codes[category]
+    finally:
+        conn.close()
+
+    orders = orders[np.argsort(orders[:, 0], kind="stable")]
+    order_ids = orders[:, 0].astype(np.int64)
+    return {
+        'order_id': order_ids,
+        'ts': orders[:, 1].astype(np.int64),
+        'total': orders[:, 2],
+        'tax': orders[:, 3],
+        'discount': orders[:, 4],
+        # Orders are sorted by id, so a binary search maps every item to its
+        # order's row.
+        'item_order': np.searchsorted(order_ids, items[:, 0].astype(np.int64)),
+        'quantity': items[:, 2],
+        'price': items[:, 3],
+        'cost': items[:, 4],
+        'category': unique_codes[inverse] if len(items) else np.zeros(0, dtype=np.int64),
+        'categories': categories,
+    }
+
+def aggregate(cols):
+    n_orders = len(cols['ts'])
+    if n_orders == 0:
+        return None
+    # created_at is stored as local wall-clock time, so epoch arithmetic on
+    # it yields local days and hours directly.
+    day = cols['ts'] // 86400
+    first_day = int(day.min())
+    day_index = day - first_day
+    n_days = int(day_index.max()) + 1
+    hour = (cols['ts'] % 86400) // 3600
+    weekday = (day + 3) % 7        # 1970-01-01 was a Thursday; Monday = 0
+
+    sales = cols['quantity'] * cols['price']
+    cost = cols['quantity'] * cols['cost']
+    item_day = day_index[cols['item_order']]
+    n_cat = len(cols['categories'])
+
+    daily_orders = np.bincount(day_index, minlength=n_days)
+    active_days = max(int(np.count_nonzero(daily_orders)), 1)
+    cat_sales = np.bincount(cols['category'], weights=sales, minlength=n_cat)
+    cat_cost = np.bincount(cols['category'], weights=cost, minlength=n_cat)
+    cat_qty = np.bincount(cols['category'], weights=cols['quantity'], minlength=n_cat)
+    revenue = float(cols['total'].sum())
+    item_sales = float(sales.sum())
+    item_cost = float(cost.sum())
+
+    order = np.argsort(-cat_sales)
+    return {
+        'summary': {
+            'orders': n_orders,
+            'revenue': revenue,
+            'tax': float(cols['tax'].sum()),
+            'discount': float(cols['discount'].sum()),
+            'average_ticket': revenue / n_orders,
+            'items_sold': float(cols['quantity'].sum()),
+            'item_sales': item_sales,
+            'item_cost': item_cost,
+            'gross_profit': item_sales - item_cost,
+            'gross_margin': (item_sales - item_cost) / item_sales if item_sales else 0.0,
+            'days': n_days,
+            'active_days': active_days,
+        },
+        'daily': {
+            'date': [(date(1970, 1, 1) + timedelta(days=first_day + d)).isoformat() for d in range(n_days)],
+            'orders': daily_orders.tolist(),
+            'revenue': np.bincount(day_index, weights=cols['total'], minlength=n_days).tolist(),
+            'item_sales': np.bincount(item_day, weights=sales, minlength=n_days).tolist(),
+            'gross_profit': np.bincount(item_day, weights=sales - cost, minlength=n_days).tolist(),
+        },
+        'hourly': {
+            'orders_per_day': (np.bincount(hour, minlength=24) / active_days).tolist(),
+            'revenue_per_day': (np.bincount(hour, weights=cols['total'], minlength=24) / active_days).tolist(),
+        },
+        'weekday_hour_orders': np.bincount(weekday * 24 + hour, minlength=168).reshape(7, 24).tolist(),
+        'categories': [
+            {'category': cols['categories'][c], 'quantity': float(cat_qty[c]), 'sales': float(cat_sales[c]),
+             'cost': float(cat_cost[c]), 'gross_profit': float(cat_sales[c] - cat_cost[c])}
+            for c in order.tolist()
+        ],
+    }
+
+def _money(value, places):
+    return f"{value:,.{places}f}"
+
+def _label_step(count, slots=16):
+    return max(1, -(-count // slots))
+
+def _style_axes(chart):
+    for axis in (chart.categoryAxis, chart.valueAxis):
+        axis.labels.fontName = "Helvetica"
+        axis.labels.fontSize = 6
+        axis.labels.fillColor = C_MUTED
+        axis.strokeColor = C_BORDER
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labelTextFormat = lambda v: f"{v:,.0f}"
+    chart.valueAxis.gridStrokeColor = C_BORDER
+    chart.valueAxis.visibleGrid = True
+
+def _legend(x, y, pairs):
+    legend = Legend()
+    legend.x, legend.y = x, y
+    legend.fontName = "Helvetica"
+    legend.fontSize = 7
+    legend.columnMaximum = 1
+    legend.dx = legend.dy = 6
+    legend.deltax = 90
+    legend.alignment = "right"
+    legend.colorNamePairs = pairs
+    return legend
+
+def daily_chart(daily, height=170):
+    drawing = Drawing(CHART_WIDTH, height)
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 40, 30
+    chart.width, chart.height = CHART_WIDTH - 60, height - 55
+    chart.data = [daily['revenue'], daily['gross_profit']]
+    _style_axes(chart)
+    step = _label_step(len(daily['date']))
+    chart.categoryAxis.categoryNames = [d[5:] if i % step == 0 else "" for i, d in enumerate(daily['date'])]
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = "ne"
+    # A tick per day turns into a solid bar over a quarter or more
+    chart.categoryAxis.visibleTicks = step == 1
+    chart.lines[0].strokeColor = C_SECONDARY
+    chart.lines[0].strokeWidth = 1.2
+    chart.lines[1].strokeColor = C_TEAL
+    chart.lines[1].strokeWidth = 1.2
+    drawing.add(chart)
+    drawing.add(_legend(45, height - 8, [(C_SECONDARY, "Revenue"), (C_TEAL, "Gross profit (items)")]))
+    return drawing
+
+def hourly_chart(hourly, height=150):
+    drawing = Drawing(CHART_WIDTH, height)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 40, 25
+    chart.width, chart.height = CHART_WIDTH - 60, height - 45
+    chart.data = [hourly['orders_per_day']]
+    _style_axes(chart)
+    chart.categoryAxis.categoryNames = [f"{h:02d}" for h in range(24)]
+    chart.bars[0].fillColor = C_INDIGO
+    chart.bars[0].strokeColor = None
+    chart.barSpacing = 1
+    drawing.add(chart)
+    drawing.add(String(40, height - 10, "Average orders per day by hour of day", fontName="Helvetica",
+                       fontSize=7, fillColor=C_MUTED))
+    return drawing
+
+def category_chart(categories, top=12, height=None):
+    rows = categories[:top][::-1]
+    height = height or 40 + 16 * max(len(rows), 1)
+    drawing = Drawing(CHART_WIDTH, height)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 120, 20
+    chart.width, chart.height = CHART_WIDTH - 140, height - 35
+    chart.data = [[c['sales'] for c in rows], [c['gross_profit'] for c in rows]]
+    _style_axes(chart)
+    chart.categoryAxis.categoryNames = [c['category'][:24] for c in rows]
+    chart.categoryAxis.labels.fontSize = 6.5
+    chart.categoryAxis.labels.fillColor = C_PRIMARY
+    chart.bars[0].fillColor = C_SECONDARY
+    chart.bars[1].fillColor = C_TEAL
+    chart.bars.strokeColor = None
+    chart.groupSpacing = 3
+    drawing.add(chart)
+    drawing.add(_legend(125, height - 6, [(C_SECONDARY, "Sales"), (C_TEAL, "Gross profit")]))
+    return drawing
+
+def _grid(rows, col_widths, styles):
+    table = Table([[Paragraph(f"<b>{c}</b>", styles['table_header']) for c in rows[0]]]
+                  + [[Paragraph(str(c), styles['table_cell']) for c in row] for row in rows[1:]],
+                  colWidths=col_widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), C_PRIMARY),
+        ('PADDING', (0, 0), (-1, -1), 3),
+        ('GRID', (0, 0), (-1, -1), 0.5, C_BORDER),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_BG_LIGHT]),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    return table
+
+def build_report(report, filename, title, places=3):
+    doc = SimpleDocTemplate(filename, pagesize=letter, leftMargin=54, rightMargin=54, topMargin=54, bottomMargin=54)
+    styles = build_styles()
+    s = report['summary']
+    story = [
+        Paragraph(title, styles['h1']),
+        Paragraph(f"{report['daily']['date'][0]} to {report['daily']['date'][-1]} · {s['orders']:,} completed orders "
+                  f"over {s['active_days']} trading days", styles['callout']),
+        Spacer(1, 6),
+        _grid([
+            ["Revenue", "Orders", "Avg ticket", "Tax", "Discounts", "Items sold", "Gross profit", "Margin"],
+            [_money(s['revenue'], places), f"{s['orders']:,}", _money(s['average_ticket'], places),
+             _money(s['tax'], places), _money(s['discount'], places), f"{s['items_sold']:,.0f}",
+             _money(s['gross_profit'], places), f"{s['gross_margin']:.1%}"],
+        ], [63] * 8, styles),
+        Paragraph("Daily Revenue & Gross Profit", styles['h2']),
+        daily_chart(report['daily']),
+        Paragraph("Hourly Peaks", styles['h2']),
+        hourly_chart(report['hourly']),
+        Paragraph("Gross profit is item sales less purchase cost, before tax, discounts and delivery charges.",
+                  styles['callout']),
+        KeepTogether([Paragraph("Sales by Category", styles['h2']), category_chart(report['categories'])]),
+        Spacer(1, 6),
+        _grid([["Category", "Qty", "Sales", "Cost", "Gross profit", "Margin"]] + [
+            [c['category'], f"{c['quantity']:,.0f}", _money(c['sales'], places), _money(c['cost'], places),
+             _money(c['gross_profit'], places), f"{c['gross_profit'] / c['sales']:.1%}" if c['sales'] else "-"]
+            for c in report['categories']
+        ], [154, 50, 75, 75, 90, 60], styles),
+    ]
+    doc.build(story, canvasmaker=AnalyticsCanvas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate orders/order_items with vectorized group-bys and chart them in a PDF.")
+    parser.add_argument("db", nargs="?", default=ORDERS_DB)
+    parser.add_argument("--menu-db", default=MENU_DB, help="for item categories")
+    parser.add_argument("--from", dest="first", help="first day, YYYY-MM-DD (default: 30 days ago)")
+    parser.add_argument("--to", dest="last", help="last day, inclusive (default: today)")
+    parser.add_argument("--status", default="completed")
+    parser.add_argument("--decimals", type=int, default=3)
+    parser.add_argument("-o", "--output", default="SIMS_Cafe_Sales_Analytics.pdf")
+    parser.add_argument("--json", help="also write the aggregates here")
+    args = parser.parse_args(argv)
+
+    if np is None:
+        sys.exit("sales_analytics needs numpy (pip install numpy)")
+    if not os.path.exists(args.db):
+        sys.exit(f"Database not found: {args.db}")
+    last = date.fromisoformat(args.last) if args.last else date.today()
+    first = date.fromisoformat(args.first) if args.first else last - timedelta(days=29)
+
+    started = time.perf_counter()
+    cols = load_columns(args.db, first.isoformat(), (last + timedelta(days=1)).isoformat(), args.menu_db, args.status)
+    loaded = time.perf_counter()
+    report = aggregate(cols)
+    aggregated = time.perf_counter()
+    if report is None:
+        sys.exit(f"No {args.status} orders between {first} and {last}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    build_report(report, args.output, f"Sales Analytics — {first.isoformat()} to {last.isoformat()}", args.decimals)
+    done = time.perf_counter()
+    print(f"{len(cols['ts']):,} orders / {len(cols['quantity']):,} items: load {loaded - started:.2f}s, "
+          f"aggregate {aggregated - loaded:.2f}s, render {done - aggregated:.2f}s")
+    print(f"Successfully generated {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from flask import Flask
+from flask_cors import CORS
+from sqlalchemy import event
+
+from .config import Config, engine_options, missing_secrets
+from .extensions import db, jwt
+from .auth import auth_bp
+from .sync import sync_bp
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def create_app(overrides=None):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if overrides:
+        app.config.update(overrides)
+        if 'SQLALCHEMY_DATABASE_URI' in overrides and 'SQLALCHEMY_ENGINE_OPTIONS' not in overrides:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(overrides['SQLALCHEMY_DATABASE_URI'])
+    missing = missing_secrets(app.config)
+    if missing and not app.testing:
+        # Without these anyone could register a device and read a store's data
+        raise RuntimeError(f"{', '.join(missing)} must be set (or TESTING=1 for local tests)")
+
+    CORS(app)
+    db.init_app(app)
+    jwt.init_app(app)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(sync_bp)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _sqlite_pragmas)
+        db.create_all()
+    return app
@@ -0,0 +1,34 @@
+import hmac
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import create_access_token
+
+from .config import missing_secrets
+from .extensions import db
+from .models import Device, utc_now
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+
+@auth_bp.post('/device')
+def register_device():
+    body = request.get_json(silent=True) or {}
+    store_id = str(body.get('storeId') or '').strip()
+    device_id = str(body.get('deviceId') or '').strip()
+    if not store_id or not device_id:
+        return jsonify({'error': 'storeId and deviceId are required'}), 400
+
+    if missing_secrets(current_app.config) and not current_app.testing:
+        return jsonify({'error': 'device registration is not configured on this server'}), 503
+    expected = current_app.config['DEVICE_REGISTRATION_KEY']
+    if expected and not hmac.compare_digest(str(body.get('registrationKey') or ''), expected):
+        return jsonify({'error': 'invalid registration key'}), 401
+
+    device = db.session.execute(db.select(Device).filter_by(device_id=device_id)).scalar_one_or_none()
+    if device is None:
+        device = Device(store_id=store_id, device_id=device_id, name=body.get('name') or '', created_at=utc_now())
+        db.session.add(device)
+    elif device.store_id != store_id:
+        return jsonify({'error': 'device is registered to another store'}), 409
+    db.session.commit()
+
+    token = create_access_token(identity=device_id, additional_claims={'store_id': store_id})
+    return jsonify({'accessToken': token, 'storeId': store_id, 'deviceId': device_id})
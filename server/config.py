@@ -0,0 +1,50 @@
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def engine_options(url):
+    # SQLite (local runs) serializes writers, so a long busy timeout matters
+    # more than pool size; MySQL gets a real pool sized for bursts of devices.
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        return {}
+    if url.startswith("sqlite"):
+        return {
+            'connect_args': {'timeout': 30, 'check_same_thread': False},
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 20)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 40)),
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 40)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///cafe_cloud.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Set TESTING=1 to run without the secrets below (local tests only)
+    TESTING = os.getenv('TESTING', '').lower() in ('1', 'true', 'yes')
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', '')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_EXPIRES_DAYS', 30)))
+    # Shared secret a device presents once to obtain its token
+    DEVICE_REGISTRATION_KEY = os.getenv('DEVICE_REGISTRATION_KEY', '')
+    PUSH_BATCH_SIZE = int(os.getenv('PUSH_BATCH_SIZE', 500))
+    PUSH_MAX_RECORDS = int(os.getenv('PUSH_MAX_RECORDS', 20000))
+    SNAPSHOT_CHUNK_ROWS = int(os.getenv('SNAPSHOT_CHUNK_ROWS', 1000))
+    # serverTime handed back to pulling devices is this far in the past, so
+    # a push that commits while a snapshot is streaming is picked up again
+    # on the next pull instead of being skipped
+    PULL_OVERLAP_SECONDS = int(os.getenv('PULL_OVERLAP_SECONDS', 5))
+
+def missing_secrets(config):
+    missing = []
+    if config.get('JWT_SECRET_KEY') in (None, '', 'change-me'):
+        missing.append('JWT_SECRET_KEY')
+    if not config.get('DEVICE_REGISTRATION_KEY'):
+        missing.append('DEVICE_REGISTRATION_KEY')
+    return missing
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from sqlalchemy import String, Text, Integer, Boolean, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .extensions import db
+
+# Entity lists carried by SyncPushPayload / SyncResponse in lan_sync_models.dart
+ENTITIES = ('orders', 'menuItems', 'tables', 'persons', 'deliveryBoys', 'creditTransactions')
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+class Device(db.Model):
+    __tablename__ = 'devices'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    store_id: Mapped[str] = mapped_column(String(64), index=True)
+    device_id: Mapped[str] = mapped_column(String(128), unique=True)
+    name: Mapped[str] = mapped_column(String(128), default='')
+    last_push_at: Mapped[str] = mapped_column(String(40), default='')
+    created_at: Mapped[str] = mapped_column(String(40), default=utc_now)
+
+class SyncRecord(db.Model):
+    __tablename__ = 'sync_records'
+    __table_args__ = (
+        UniqueConstraint('store_id', 'entity', 'record_id', name='uq_sync_records_key'),
+        # Pull path: "this entity for this store, stored after my last sync"
+        Index('ix_sync_records_pull', 'store_id', 'entity', 'synced_at'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    store_id: Mapped[str] = mapped_column(String(64))
+    entity: Mapped[str] = mapped_column(String(32))
+    record_id: Mapped[str] = mapped_column(String(128))
+    # Device clock, used for Last-Write-Wins between devices
+    updated_at: Mapped[str] = mapped_column(String(40))
+    # Server clock, used for incremental pulls so late pushes from a device
+    # that was offline are not skipped by clients that already synced past
+    # their updated_at
+    synced_at: Mapped[str] = mapped_column(String(40))
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    device_id: Mapped[str] = mapped_column(String(128), default='')
+    # Stored as the JSON text the device sent so snapshots stream it verbatim
+    payload: Mapped[str] = mapped_column(Text)
@@ -0,0 +1,128 @@
+import json
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from .extensions import db
+from .models import ENTITIES, Device, SyncRecord, utc_now
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api')
+
+UPSERT_KEY = ('store_id', 'entity', 'record_id')
+UPSERT_COLUMNS = ('synced_at', 'is_deleted', 'device_id', 'payload', 'updated_at')
+
+def _upsert_statement(dialect_name):
+    # Insert-or-update in one statement per batch. An existing row is only
+    # overwritten when the incoming updated_at is newer (Last-Write-Wins).
+    table = SyncRecord.__table__
+    if dialect_name == 'mysql':
+        stmt = mysql.insert(table)
+        newer = stmt.inserted.updated_at > table.c.updated_at
+        # MySQL applies the assignments left to right, so updated_at has to
+        # be the last one or the comparison would see the new value.
+        return stmt.on_duplicate_key_update([
+            (col, func.if_(newer, stmt.inserted[col], table.c[col])) for col in UPSERT_COLUMNS
+        ])
+    insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(UPSERT_KEY),
+        set_={col: stmt.excluded[col] for col in UPSERT_COLUMNS},
+        where=stmt.excluded.updated_at > table.c.updated_at,
+    )
+
+def _stamp(row):
+    return str(row.get('updated_at') or row.get('lastUpdated') or row.get('updatedAt') or '')
+
+def _collect_records(body, store_id, device_id, synced_at):
+    records = {}
+    for entity in ENTITIES:
+        for row in body.get(entity) or []:
+            if not isinstance(row, dict) or row.get('id') is None:
+                raise ValueError(f"{entity} record without an id")
+            key = (entity, str(row['id']))
+            stamp = _stamp(row)
+            # A batch can carry the same record twice; keep the newest so a
+            # single statement never conflicts with itself.
+            if key in records and records[key]['updated_at'] >= stamp:
+                continue
+            records[key] = {
+                'store_id': store_id,
+                'entity': entity,
+                'record_id': key[1],
+                'updated_at': stamp,
+                'synced_at': synced_at,
+                'is_deleted': bool(row.get('is_deleted') or row.get('isDeleted')),
+                'device_id': device_id,
+                'payload': json.dumps(row, separators=(',', ':')),
+            }
+    return list(records.values())
+
+@sync_bp.get('/ping')
+def ping():
+    return jsonify({'status': 'ok', 'serverName': 'SIMS Cafe Cloud', 'timestamp': utc_now()})
+
+@sync_bp.post('/sync/push')
+@jwt_required()
+def push():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'expected a JSON object'}), 400
+    store_id = get_jwt()['store_id']
+    device_id = get_jwt_identity()
+    synced_at = utc_now()
+    try:
+        records = _collect_records(body, store_id, device_id, synced_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(records) > current_app.config['PUSH_MAX_RECORDS']:
+        return jsonify({'error': 'push too large, split it into smaller batches'}), 413
+
+    stmt = _upsert_statement(db.engine.dialect.name)
+    batch_size = current_app.config['PUSH_BATCH_SIZE']
+    for start in range(0, len(records), batch_size):
+        db.session.execute(stmt, records[start:start + batch_size])
+    db.session.execute(update(Device).where(Device.device_id == device_id).values(last_push_at=synced_at))
+    db.session.commit()
+    return jsonify({'status': 'ok', 'serverTime': synced_at, 'accepted': True, 'received': len(records)})
+
+def _stream_snapshot(store_id, since):
+    started = datetime.now(timezone.utc)
+    overlap = timedelta(seconds=current_app.config['PULL_OVERLAP_SECONDS'])
+    server_time = (started - overlap).isoformat(timespec='microseconds')
+    chunk_rows = current_app.config['SNAPSHOT_CHUNK_ROWS']
+
+    yield '{"serverTime":' + json.dumps(server_time)
+    for entity in ENTITIES:
+        query = db.select(SyncRecord.payload).where(SyncRecord.store_id == store_id, SyncRecord.entity == entity)
+        if since:
+            query = query.where(SyncRecord.synced_at > since)
+        else:
+            query = query.where(SyncRecord.is_deleted.is_(False))
+        rows = db.session.execute(query.execution_options(yield_per=chunk_rows)).scalars()
+
+        yield ',' + json.dumps(entity) + ':['
+        first = True
+        for chunk in rows.partitions():
+            yield ('' if first else ',') + ','.join(chunk)
+            first = False
+        yield ']'
+    yield '}'
+
+def _snapshot_response(since):
+    store_id = get_jwt()['store_id']
+    return Response(stream_with_context(_stream_snapshot(store_id, since)), mimetype='application/json')
+
+@sync_bp.get('/sync/full')
+@jwt_required()
+def full_sync():
+    return _snapshot_response(None)
+
+@sync_bp.post('/sync/incremental')
+@jwt_required()
+def incremental_sync():
+    body = request.get_json(silent=True) or {}
+    since = body.get('lastSyncedAt') or body.get('since')
+    return _snapshot_response(str(since) if since else None)
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+
+import pytest
+
+import db_maintenance
+from cafe_schema import create_orders_schema
+from db_maintenance import maintain, slowdowns
+
+@pytest.fixture
+def orders_db(tmp_path):
+    # A WAL-mode orders database with a few days of orders and items
+    path = str(tmp_path / 'cafe_orders.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_orders_schema(conn)
+    conn.executemany("INSERT INTO orders (id, staff_device_id, service_type, subtotal, tax, discount, total, status, "
+                     "created_at, updated_at) VALUES (?, 'tab-1', 'Takeout', 10, 0, 0, 10, 'completed', ?, ?)",
+                     [(i, f"2026-10-0{1 + i % 3}T10:00:00", f"2026-10-0{1 + i % 3}T10:00:00") for i in range(300)])
+    conn.executemany("INSERT INTO order_items (order_id, menu_item_id, name, price, quantity) "
+                     "VALUES (?, 1, 'Tea', 2.5, 2)", [(i,) for i in range(300)])
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def steady(monkeypatch):
+    # Timings on a 300-row table are all noise; tests that expect a swap
+    # must not be refused because one query hiccuped
+    monkeypatch.setattr(db_maintenance, 'slowdowns', lambda before, after: [])
+
+def count_orders(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    finally:
+        conn.close()
+
+def has_statistics(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+def test_slowdowns_ignore_noise():
+    before = {'a': {'ms': 10.0}, 'b': {'ms': 0.2}, 'c': {'ms': 10.0}, 'd': {'error': 'no such table'}}
+    after = {'a': {'ms': 20.0}, 'b': {'ms': 0.9}, 'c': {'ms': 13.0}, 'd': {'error': 'no such table'}}
+    assert slowdowns(before, after) == ['a']
+
+def test_replace_swaps_in_the_copy(orders_db, tmp_path, steady):
+    result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, replace=True)
+    assert result['replaced']
+    assert count_orders(orders_db) == 300
+    assert has_statistics(orders_db)
+    assert os.path.exists(orders_db + '.bak')
+    assert not os.path.exists(tmp_path / 'out' / 'cafe_orders.db')
+
+def test_slower_queries_roll_back_analyze(orders_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_maintenance, 'slowdowns', lambda before, after: ['orders page'])
+    result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, apply=True, replace=True)
+    assert not result['replaced']
+    assert 'queries got slower: orders page' in result['not_replaced']
+    assert not has_statistics(str(tmp_path / 'out' / 'cafe_orders.db'))
+    assert not os.path.exists(orders_db + '.bak')
+
+def test_busy_checkpoint_refuses_replace(orders_db, tmp_path):
+    # A reader pinned to an old snapshot keeps the newer frames in the WAL
+    reader = sqlite3.connect(orders_db, isolation_level=None)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM orders").fetchone()
+    writer = sqlite3.connect(orders_db)
+    writer.execute("UPDATE orders SET total = 11")
+    writer.commit()
+    writer.close()
+    try:
+        result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, replace=True)
+    finally:
+        reader.close()
+    assert result['checkpoint']['busy']
+    assert not result['replaced']
+    assert 'WAL busy' in result['not_replaced']
+    assert not os.path.exists(orders_db + '.bak')
+
+def test_open_writer_refuses_replace(orders_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_maintenance, 'lock_original', lambda path: None)
+    result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, replace=True)
+    assert not result['replaced']
+    assert 'was writing' in result['not_replaced']
+    assert not os.path.exists(orders_db + '.bak')
+
+def test_original_is_locked_until_the_swap(orders_db, tmp_path, monkeypatch, steady):
+    # A write attempted after the copy was taken must fail rather than be
+    # left behind in the .bak
+    attempts = []
+    def advise(conn, queries, measured, repeat):
+        other = sqlite3.connect(orders_db, timeout=0)
+        try:
+            other.execute("INSERT INTO orders (id, staff_device_id, service_type, subtotal, tax, discount, total, "
+                          "status) VALUES (1000, 'tab-1', 'Takeout', 1, 0, 0, 1, 'completed')")
+            other.commit()
+            attempts.append('written')
+        except sqlite3.OperationalError as e:
+            attempts.append(str(e))
+        finally:
+            other.close()
+        return []
+    monkeypatch.setattr(db_maintenance, 'advise', advise)
+    result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, replace=True)
+    assert attempts == ['database is locked']
+    assert result['replaced']
+    assert count_orders(orders_db) == 300
+    # The lock is released afterwards
+    conn = sqlite3.connect(orders_db, timeout=0)
+    conn.execute("UPDATE orders SET total = 12 WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+def test_no_vacuum_leaves_the_original_in_place(orders_db, tmp_path):
+    result = maintain(orders_db, str(tmp_path / 'out'), repeat=1, vacuum=False)
+    assert 'replaced' not in result
+    assert has_statistics(orders_db)
+    assert not os.path.exists(tmp_path / 'out')
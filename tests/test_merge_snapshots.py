@@ -0,0 +1,127 @@
+import csv
+import sqlite3
+
+import pytest
+
+from cafe_schema import create_orders_schema
+from merge_snapshots import main, merge_database
+
+@pytest.fixture
+def snapshots(tmp_path):
+    # Host and tablet copies of the orders database, as left by an offline day
+    paths = []
+    for name in ('host.db', 'tab.db'):
+        conn = sqlite3.connect(tmp_path / name)
+        create_orders_schema(conn)
+        conn.close()
+        paths.append(str(tmp_path / name))
+    return paths
+
+def add_order(path, order_id, updated_at, total=10.0, is_deleted=0, is_synced=0, items=()):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO orders (id, staff_device_id, service_type, subtotal, tax, discount, total, status, "
+                 "created_at, updated_at, is_deleted, is_synced) "
+                 "VALUES (?, 'tab-1', 'Takeout', ?, 0, 0, ?, 'completed', ?, ?, ?, ?)",
+                 (order_id, total, total, updated_at, updated_at, is_deleted, is_synced))
+    conn.executemany("INSERT INTO order_items (order_id, menu_item_id, name, price, quantity) VALUES (?, 1, ?, 1.0, ?)",
+                     [(order_id, name, quantity) for name, quantity in items])
+    conn.commit()
+    conn.close()
+
+def orders(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, total, is_deleted, is_synced FROM orders ORDER BY id").fetchall()
+    conn.close()
+    return {row[0]: row[1:] for row in rows}
+
+def items(path, order_id):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT name, quantity FROM order_items WHERE order_id = ? ORDER BY id", (order_id,)).fetchall()
+    conn.close()
+    return rows
+
+def test_newest_write_wins(snapshots):
+    host, tab = snapshots
+    add_order(host, 1, '2026-10-01T10:00:00', total=1.0)
+    add_order(tab, 1, '2026-10-01T11:00:00', total=2.0)
+    add_order(host, 2, '2026-10-01T12:00:00', total=3.0)
+    add_order(tab, 2, '2026-10-01T11:00:00', total=4.0)
+    add_order(host, 3, '2026-10-01T10:00:00', total=5.0)
+    add_order(tab, 3, '2026-10-01T10:00:00', total=5.0)
+    add_order(tab, 4, '2026-10-01T09:00:00', total=6.0)
+    # Offsets are compared as instants: 10:30+04:00 is before 10:00 UTC
+    add_order(host, 5, '2026-10-01T10:00:00', total=7.0)
+    add_order(tab, 5, '2026-10-01T10:30:00+04:00', total=8.0)
+    results, skipped = merge_database(host, tab)
+    assert {k: v[0] for k, v in orders(host).items()} == {1: 2.0, 2: 3.0, 3: 5.0, 4: 6.0, 5: 7.0}
+    stats = next(r for r in results if r['table'] == 'orders')
+    assert (stats['inserted'], stats['updated'], stats['kept'], stats['same']) == (1, 1, 2, 1)
+    assert ('order_items', 'no updated_at column') not in skipped
+
+def test_tombstones_follow_the_newest_write(snapshots):
+    host, tab = snapshots
+    add_order(host, 1, '2026-10-01T10:00:00')
+    add_order(tab, 1, '2026-10-01T11:00:00', is_deleted=1)
+    add_order(host, 2, '2026-10-01T12:00:00', is_deleted=1)
+    add_order(tab, 2, '2026-10-01T11:00:00')
+    add_order(tab, 3, '2026-10-01T11:00:00', is_deleted=1)
+    results, _ = merge_database(host, tab)
+    assert {k: v[1] for k, v in orders(host).items()} == {1: 1, 2: 1, 3: 1}
+    assert next(r for r in results if r['table'] == 'orders')['tombstones'] == 2
+
+def test_order_items_replaced_only_when_source_has_them(snapshots):
+    host, tab = snapshots
+    add_order(host, 1, '2026-10-01T10:00:00', items=[('Tea', 1), ('Cake', 1)])
+    add_order(tab, 1, '2026-10-01T11:00:00', items=[('Tea', 3)])
+    # The tablet won the order but sent no items: the host keeps its own
+    add_order(host, 2, '2026-10-01T10:00:00', items=[('Coffee', 2)])
+    add_order(tab, 2, '2026-10-01T11:00:00')
+    add_order(host, 3, '2026-10-01T12:00:00', items=[('Juice', 1)])
+    add_order(tab, 3, '2026-10-01T11:00:00', items=[('Water', 1)])
+    add_order(tab, 4, '2026-10-01T11:00:00', items=[('Tea', 1), ('Tea', 2)])
+    merge_database(host, tab)
+    assert items(host, 1) == [('Tea', 3)]
+    assert items(host, 2) == [('Coffee', 2)]
+    assert items(host, 3) == [('Juice', 1)]
+    assert items(host, 4) == [('Tea', 1), ('Tea', 2)]
+
+def test_applied_rows_are_marked_for_upload(snapshots):
+    host, tab = snapshots
+    add_order(host, 1, '2026-10-01T10:00:00', is_synced=1)
+    add_order(tab, 1, '2026-10-01T11:00:00', is_synced=1)
+    add_order(host, 2, '2026-10-01T12:00:00', is_synced=1)
+    add_order(tab, 2, '2026-10-01T11:00:00', is_synced=0)
+    add_order(tab, 3, '2026-10-01T11:00:00', is_synced=1)
+    merge_database(host, tab)
+    assert {k: v[2] for k, v in orders(host).items()} == {1: 0, 2: 1, 3: 0}
+
+def test_dry_run_changes_nothing(snapshots):
+    host, tab = snapshots
+    add_order(host, 1, '2026-10-01T10:00:00', total=1.0)
+    add_order(tab, 1, '2026-10-01T11:00:00', total=2.0)
+    main([host, tab, '--dry-run'])
+    assert orders(host)[1][0] == 1.0
+
+def test_since_limits_the_conflict_report(snapshots, tmp_path):
+    host, tab = snapshots
+    # Both sides changed after the last sync: a real conflict
+    add_order(host, 1, '2026-10-02T10:00:00')
+    add_order(tab, 1, '2026-10-02T11:00:00', is_deleted=1)
+    # Only the tablet changed it since: a plain update, not reported
+    add_order(host, 2, '2026-09-30T10:00:00')
+    add_order(tab, 2, '2026-10-02T11:00:00')
+    add_order(host, 3, '2026-10-02T12:00:00')
+    add_order(tab, 3, '2026-10-02T09:00:00')
+    report = tmp_path / 'conflicts.csv'
+    merged = tmp_path / 'merged.db'
+    main([host, tab, '-o', str(merged), '--since', '2026-10-01T00:00:00', '--report', str(report)])
+    with open(report, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(r['key'], r['winner'], r['kind']) for r in rows] == [('1', 'source', 'delete'), ('3', 'target', 'update')]
+    # -o leaves the target alone
+    assert orders(host)[1][1] == 0
+    assert orders(str(merged))[1][1] == 1
+
+def test_rejects_bad_since(snapshots):
+    with pytest.raises(SystemExit, match='--since'):
+        main([*snapshots, '--since', 'yesterday'])
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from server import create_app
+
+STORE = 'store-1'
+
+@pytest.fixture
+def app(tmp_path):
+    # A file database rather than :memory:, so streamed pulls run on their
+    # own pooled connection the way they do in production.
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cloud.db'}",
+        'JWT_SECRET_KEY': 'test-secret-key-at-least-32-bytes-long',
+        'DEVICE_REGISTRATION_KEY': 'reg-key',
+        'PULL_OVERLAP_SECONDS': 0,
+        'PUSH_BATCH_SIZE': 2,
+    })
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def register(client, device_id='tab-1', store_id=STORE, key='reg-key'):
+    return client.post('/api/auth/device', json={'storeId': store_id, 'deviceId': device_id, 'registrationKey': key})
+
+def auth(client, device_id='tab-1', store_id=STORE):
+    token = register(client, device_id, store_id).get_json()['accessToken']
+    return {'Authorization': f'Bearer {token}'}
+
+def order(record_id, updated_at, **extra):
+    return {'id': record_id, 'updated_at': updated_at, 'total': 10.0, **extra}
+
+def pull_full(client, headers):
+    resp = client.get('/api/sync/full', headers=headers)
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    return json.loads(resp.get_data(as_text=True))
+
+def test_push_keeps_newest_write(client):
+    headers = auth(client)
+    client.post('/api/sync/push', headers=headers, json={'orders': [order(1, '2026-10-01T10:00:00', total=20.0)]})
+    resp = client.post('/api/sync/push', headers=headers, json={'orders': [order(1, '2026-10-01T09:00:00', total=5.0)]})
+    assert resp.status_code == 200
+    assert pull_full(client, headers)['orders'][0]['total'] == 20.0
+
+    client.post('/api/sync/push', headers=headers, json={'orders': [order(1, '2026-10-01T11:00:00', total=30.0)]})
+    assert pull_full(client, headers)['orders'][0]['total'] == 30.0
+
+def test_push_duplicate_ids_in_one_batch(client):
+    headers = auth(client)
+    resp = client.post('/api/sync/push', headers=headers, json={'orders': [
+        order(7, '2026-10-01T10:00:00', total=1.0),
+        order(7, '2026-10-01T12:00:00', total=3.0),
+        order(7, '2026-10-01T11:00:00', total=2.0),
+    ]})
+    assert resp.status_code == 200
+    assert resp.get_json()['received'] == 1
+    orders = pull_full(client, headers)['orders']
+    assert [o['total'] for o in orders] == [3.0]
+
+def test_full_pull_streams_live_records_of_own_store(client):
+    headers = auth(client)
+    client.post('/api/sync/push', headers=headers, json={
+        'orders': [order(i, '2026-10-01T10:00:00') for i in range(5)] + [order(99, '2026-10-01T10:00:00', is_deleted=1)],
+        'menuItems': [{'id': 'm1', 'lastUpdated': '2026-10-01T10:00:00', 'isDeleted': False}],
+    })
+    other_store = auth(client, 'tab-9', store_id='store-2')
+    client.post('/api/sync/push', headers=other_store, json={'orders': [order(500, '2026-10-01T10:00:00')]})
+    snapshot = pull_full(client, headers)
+    assert sorted(o['id'] for o in snapshot['orders']) == [0, 1, 2, 3, 4]
+    assert [m['id'] for m in snapshot['menuItems']] == ['m1']
+    assert snapshot['persons'] == []
+    assert 'serverTime' in snapshot
+
+def test_incremental_pull_returns_only_later_pushes(client):
+    headers = auth(client)
+    first = client.post('/api/sync/push', headers=headers, json={'orders': [order(1, '2026-10-01T10:00:00')]})
+    since = first.get_json()['serverTime']
+    client.post('/api/sync/push', headers=headers, json={
+        'orders': [order(2, '2026-10-01T09:00:00'), order(3, '2026-10-01T09:30:00', is_deleted=1)],
+    })
+    resp = client.post('/api/sync/incremental', headers=headers, json={'lastSyncedAt': since})
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    # Tombstones are included so the device can delete its copy
+    assert sorted(o['id'] for o in json.loads(resp.get_data(as_text=True))['orders']) == [2, 3]
+
+def test_push_rejects_record_without_id(client):
+    headers = auth(client)
+    resp = client.post('/api/sync/push', headers=headers, json={'orders': [{'updated_at': '2026-10-01T10:00:00'}]})
+    assert resp.status_code == 400
+    assert pull_full(client, headers)['orders'] == []
+
+def test_device_cannot_switch_store(client):
+    assert register(client).status_code == 200
+    assert register(client, store_id='store-2').status_code == 409
+
+def test_registration_key_is_checked(client):
+    assert register(client, key='wrong').status_code == 401
+
+def test_refuses_to_start_without_secrets(tmp_path):
+    with pytest.raises(RuntimeError, match='JWT_SECRET_KEY'):
+        create_app({
+            'TESTING': False,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cloud.db'}",
+            'JWT_SECRET_KEY': 'change-me',
+            'DEVICE_REGISTRATION_KEY': '',
+        })